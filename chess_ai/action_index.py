@@ -1,26 +1,82 @@
 import chess
-from functools import lru_cache
+import numpy as np
 
 PROMOTIONS = [None, chess.QUEEN, chess.ROOK, chess.BISHOP, chess.KNIGHT]
 ACTION_SIZE = 64 * 64 * len(PROMOTIONS)
+# Chess positions have at most 218 legal moves.
+MAX_LEGAL_MOVES = 256
+
+# ``PROMOTION_INDEX[piece_type]`` is the promotion slot of a move; slot 0 is
+# used for non-promotions (``promotion`` is ``None`` or 0).
+PROMOTION_INDEX = [0] * 7
+for _slot, _piece in enumerate(PROMOTIONS[1:], start=1):
+    PROMOTION_INDEX[_piece] = _slot
+
+# Static tables in both directions. ``MOVE_INDEX[from, to, piece_type]`` gives
+# the action index; ``FROM_SQUARE``/``TO_SQUARE``/``PROMOTION`` decode one.
+MOVE_INDEX = (
+    np.arange(64 * 64, dtype=np.int32).reshape(64, 64, 1) * len(PROMOTIONS)
+    + np.array(PROMOTION_INDEX, dtype=np.int32)
+)
+_ACTIONS = np.arange(ACTION_SIZE, dtype=np.int32)
+FROM_SQUARE = (_ACTIONS // len(PROMOTIONS)) // 64
+TO_SQUARE = (_ACTIONS // len(PROMOTIONS)) % 64
+PROMOTION = np.array([p or 0 for p in PROMOTIONS], dtype=np.int8)[_ACTIONS % len(PROMOTIONS)]
+_MOVES = tuple(
+    chess.Move(int(f), int(t), promotion=int(p) or None)
+    for f, t, p in zip(FROM_SQUARE, TO_SQUARE, PROMOTION)
+)
+del _ACTIONS
 
 
-@lru_cache(maxsize=None)
 def move_to_index(move: chess.Move) -> int:
-    """Convert a chess move to a unique action index.
+    """Convert a chess move to a unique action index."""
+    return (move.from_square * 64 + move.to_square) * len(PROMOTIONS) + PROMOTION_INDEX[
+        move.promotion or 0
+    ]
+
+
+def index_to_move(index: int) -> chess.Move:
+    """Inverse of :func:`move_to_index` via a precomputed table."""
+    return _MOVES[index]
+
 
-    The result is cached to speed up repeated conversions during search.
+def legal_move_indices(board: chess.Board) -> np.ndarray:
+    """Return the action indices of ``board``'s legal moves as ``int32``.
+
+    The order matches ``board.legal_moves``.
     """
-    promo_idx = PROMOTIONS.index(move.promotion)
-    return ((move.from_square * 64) + move.to_square) * len(PROMOTIONS) + promo_idx
+    return np.fromiter(
+        (move_to_index(m) for m in board.generate_legal_moves()), dtype=np.int32
+    )
 
 
-@lru_cache(maxsize=None)
-def index_to_move(index: int) -> chess.Move:
-    """Inverse of :func:`move_to_index` with caching."""
-    promo_idx = index % len(PROMOTIONS)
-    idx = index // len(PROMOTIONS)
-    from_sq = idx // 64
-    to_sq = idx % 64
-    promotion = PROMOTIONS[promo_idx]
-    return chess.Move(from_sq, to_sq, promotion=promotion)
+def legal_move_mask(board: chess.Board, out=None) -> np.ndarray:
+    """Return a boolean ``ACTION_SIZE`` mask of ``board``'s legal moves."""
+    if out is None:
+        out = np.zeros(ACTION_SIZE, dtype=bool)
+    else:
+        out[:] = False
+    out[legal_move_indices(board)] = True
+    return out
+
+
+def sparse_policy(policy, max_moves: int | None = None):
+    """Return ``policy`` as an ``(indices, probs)`` pair of arrays.
+
+    Sparse pairs pass through with normalized dtypes; a dense
+    ``ACTION_SIZE`` vector keeps only its non-zero entries. With
+    ``max_moves`` only that many of the most probable entries are kept.
+    """
+    if isinstance(policy, tuple):
+        indices, probs = policy
+    else:
+        policy = np.asarray(policy, dtype=np.float32)
+        indices = np.flatnonzero(policy)
+        probs = policy[indices]
+    indices = np.asarray(indices, dtype=np.int32)
+    probs = np.asarray(probs, dtype=np.float32)
+    if max_moves is not None and len(indices) > max_moves:
+        keep = np.argsort(probs)[-max_moves:]
+        indices, probs = indices[keep], probs[keep]
+    return indices, probs
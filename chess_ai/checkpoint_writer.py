@@ -0,0 +1,125 @@
+"""Checkpoint files written atomically on a background thread."""
+
+import collections
+import os
+import threading
+
+import torch
+
+from .config import Config
+
+
+def snapshot(obj):
+    """Copy every tensor in a nested state to CPU memory.
+
+    The copy is taken on the calling thread, so later optimizer steps cannot
+    change what ends up on disk.
+    """
+    if isinstance(obj, torch.Tensor):
+        return obj.detach().to("cpu", copy=True)
+    if isinstance(obj, dict):
+        return type(obj)((k, snapshot(v)) for k, v in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(snapshot(v) for v in obj)
+    return obj
+
+
+def write_checkpoint(path: str, state) -> str:
+    """Save ``state`` to ``path`` without ever exposing a partial file.
+
+    The data goes to ``<path>.tmp`` first, is fsynced and then renamed over
+    ``path``. A crash leaves either the previous file or the new one.
+    """
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        torch.save(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:  # pragma: no cover - directories cannot be opened on Windows
+        return path
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    return path
+
+
+class CheckpointWriter:
+    """Serialize checkpoints off the training thread.
+
+    :meth:`submit` only snapshots the state to CPU memory; a worker thread
+    saves it with :func:`write_checkpoint` and then deletes all but the
+    ``keep_last`` most recent files written by this writer. The thread
+    runs while writes are pending and is not a daemon, so queued
+    checkpoints are finished before the interpreter exits. Errors from the
+    worker are re-raised by the next :meth:`submit` or :meth:`wait`.
+    """
+
+    def __init__(self, keep_last: int | None = Config.CHECKPOINT_KEEP):
+        self.keep_last = keep_last
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending = collections.deque()
+        self._written = collections.deque()
+        self._thread = None
+        self._error = None
+
+    def submit(self, path: str, state, on_saved=None) -> str:
+        """Queue ``state`` to be saved at ``path`` and return ``path``.
+
+        ``on_saved(path)`` is called on the worker thread once the file is
+        complete.
+        """
+        state = snapshot(state)
+        with self._lock:
+            self._raise_error()
+            self._pending.append((path, state, on_saved))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="checkpoint-writer")
+                self._thread.start()
+        return path
+
+    def wait(self):
+        """Block until every submitted checkpoint is on disk."""
+        with self._idle:
+            while self._thread is not None:
+                self._idle.wait()
+            self._raise_error()
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._thread = None
+                    self._idle.notify_all()
+                    return
+                path, state, on_saved = self._pending[0]
+            try:
+                write_checkpoint(path, state)
+                self._prune(path)
+                if on_saved is not None:
+                    on_saved(path)
+            except Exception as exc:  # forwarded to the training thread
+                self._error = exc
+            with self._lock:
+                self._pending.popleft()
+
+    def _prune(self, path: str):
+        if path in self._written:
+            self._written.remove(path)
+        self._written.append(path)
+        if self.keep_last is None:
+            return
+        while len(self._written) > self.keep_last:
+            try:
+                os.remove(self._written.popleft())
+            except FileNotFoundError:
+                pass
@@ -3,8 +3,11 @@ class Config:
 
     # Paths
     CHECKPOINT_DIR = "checkpoints"
+    # Checkpoints kept per writer; older ones are deleted after each save.
+    CHECKPOINT_KEEP = 5
     REPLAY_BUFFER_SIZE = 100_000
     GAMES_PER_ITER = 5000
+    REPLAY_DB_PATH = "replay.lmdb"
     LOG_DIR = "runs"
     WANDB_PROJECT = "chess-ai"
 
@@ -16,14 +19,59 @@ class Config:
         "cuda:0" if __import__("torch").cuda.is_available() else "cpu"
     )
     SEED = 42
+    # Self-play worker processes and games each of them plays in lockstep.
+    SELF_PLAY_WORKERS = __import__("os").cpu_count() or 1
+    SELF_PLAY_LOCKSTEP_GAMES = 8
 
     # MCTS parameters
     # For a single RTX 5070 we use a lighter search to speed up self-play.
     NUM_SIMULATIONS = 400
+    # Leaves collected per network call; virtual loss keeps them apart.
+    MCTS_BATCH_SIZE = 8
+    VIRTUAL_LOSS = 1
+    # Optional early stop when the best root move is decided; never before
+    # MCTS_MIN_SIMULATIONS root visits. A dominant fraction (e.g. 0.9) also
+    # stops once one move holds that share of visits; None disables it.
+    MCTS_EARLY_STOP = False
+    MCTS_MIN_SIMULATIONS = 32
+    MCTS_DOMINANT_FRACTION = None
     C_PUCT = 1.5
     DIRICHLET_EPSILON = 0.25
     DIRICHLET_ALPHA = 0.03
 
+    # UCI
+    # Time management: safety margin per move and assumed moves left.
+    UCI_MOVE_OVERHEAD_MS = 50
+    UCI_MOVES_TO_GO = 30
+    # MCTS has no search depth; ``go depth N`` runs N times this many
+    # simulations.
+    UCI_SIMULATIONS_PER_DEPTH = 64
+
+    # Inference server and parallel search
+    # Largest server batch and how long to wait filling it.
+    INFERENCE_MAX_BATCH = 256
+    INFERENCE_MAX_LATENCY_MS = 2.0
+    # Worker processes for root-parallel search (ParallelMCTS).
+    MCTS_WORKERS = 1
+    # Memory budget of the per-search network evaluation cache.
+    EVAL_CACHE_BYTES = 128 * 1024 * 1024
+
+    # Evaluation / gating
+    # Games ``evaluate`` plays in lockstep; their leaves share forward passes.
+    EVAL_CONCURRENT_GAMES = 32
+    # Background gating of new checkpoints (chess_ai.gating): output
+    # directory, match length, search budget, ply limit and torch threads.
+    GATING_DIR = "gating"
+    GATING_GAMES = 100
+    GATING_SIMULATIONS = 50
+    GATING_MAX_MOVES = 60
+    GATING_THREADS = 1
+    # SPRT hypotheses in Elo and its error rates.
+    SPRT_ELO0 = -5
+    SPRT_ELO1 = 5
+    SPRT_ALPHA = 0.05
+    SPRT_BETA = 0.05
+
     # Network parameters
     NUM_RES_BLOCKS = 19
     NUM_FILTERS = 256
@@ -31,6 +79,14 @@ class Config:
     LEARNING_RATE = 2e-4
     BATCH_SIZE = 256
     NUM_EPOCHS = 3
+    # Optimizer steps per epoch of ``Trainer.train`` and batches kept ready
+    # by the background sampling thread.
+    STEPS_PER_EPOCH = 100
+    PREFETCH_BATCHES = 4
+    # Intra-op and inter-op threads for CPU training; None keeps torch's
+    # defaults (one intra-op thread per physical core).
+    TRAIN_THREADS = None
+    TRAIN_INTEROP_THREADS = None
     FILTER_QUIET_POSITIONS = True
     WEIGHT_DECAY = 1e-4
     MOMENTUM = 0.9
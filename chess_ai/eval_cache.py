@@ -0,0 +1,95 @@
+"""Bounded cache of network evaluations used by the MCTS."""
+
+import sys
+from collections import OrderedDict
+
+import chess
+import chess.polyglot
+import numpy as np
+
+from .config import Config
+
+# Rough per-entry cost of the dict slot, the tuple and the key int on top of
+# the two NumPy arrays.
+_ENTRY_OVERHEAD = 200
+
+
+def position_key(board: chess.Board) -> int:
+    """Return a 64-bit Zobrist hash covering pieces, side, castling and ep."""
+    return chess.polyglot.zobrist_hash(board)
+
+
+class EvalCache:
+    """LRU cache of ``(legal-move priors, value)`` with a byte budget.
+
+    Entries store the action indices of the legal moves next to their float16
+    priors. A lookup only hits when the stored moves equal the moves of the
+    position being expanded, so a hash collision degrades to a miss instead
+    of returning priors for the wrong position.
+    """
+
+    def __init__(self, max_bytes: int = Config.EVAL_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.nbytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hit_rate,
+        }
+
+    def get(self, key: int, moves: np.ndarray):
+        """Return ``(priors, value)`` for ``key`` or ``None`` on a miss."""
+        entry = self._entries.get(key)
+        if entry is None or not np.array_equal(entry[0], moves):
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1].astype(np.float32), entry[2]
+
+    def put(self, key: int, moves: np.ndarray, priors: np.ndarray, value: float):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.nbytes -= self._entry_size(old)
+        entry = (
+            np.asarray(moves, dtype=np.int16),
+            np.asarray(priors, dtype=np.float16),
+            float(value),
+        )
+        size = self._entry_size(entry)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = entry
+        self.nbytes += size
+        while self.nbytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= self._entry_size(evicted)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
+
+    @staticmethod
+    def _entry_size(entry) -> int:
+        return sys.getsizeof(entry[0]) + sys.getsizeof(entry[1]) + _ENTRY_OVERHEAD
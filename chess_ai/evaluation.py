@@ -1,19 +1,80 @@
+import math
+
 import chess
+import numpy as np
 
-from .game_environment import GameEnvironment
-from .mcts import MCTS
+from .eval_cache import EvalCache
+from .mcts import MCTS, NetworkEvaluator
 from .config import Config
 from .action_index import index_to_move
 
 
+# Result of a finished game from White's point of view.
+_RESULT_VALUE = {"1-0": 1, "0-1": -1}
+
+# Short, balanced opening lines in UCI notation. Each game pair of
+# :func:`evaluate` starts from the next one, once with either colour.
+OPENINGS = [
+    "e2e4 e7e5 g1f3 b8c6",
+    "e2e4 e7e5 g1f3 g8f6",
+    "e2e4 e7e5 f1c4 g8f6",
+    "e2e4 c7c5 g1f3 d7d6",
+    "e2e4 c7c5 g1f3 b8c6",
+    "e2e4 c7c5 b1c3 b8c6",
+    "e2e4 e7e6 d2d4 d7d5",
+    "e2e4 c7c6 d2d4 d7d5",
+    "e2e4 d7d6 d2d4 g8f6",
+    "e2e4 g7g6 d2d4 f8g7",
+    "d2d4 d7d5 c2c4 e7e6",
+    "d2d4 d7d5 c2c4 c7c6",
+    "d2d4 d7d5 g1f3 g8f6",
+    "d2d4 g8f6 c2c4 e7e6",
+    "d2d4 g8f6 c2c4 g7g6",
+    "d2d4 g8f6 c2c4 c7c5",
+    "d2d4 f7f5 g2g3 g8f6",
+    "c2c4 e7e5 b1c3 g8f6",
+    "c2c4 c7c5 g1f3 b8c6",
+    "g1f3 d7d5 g2g3 g8f6",
+]
+
+
+class _MatchGame:
+    """State of one game inside :func:`evaluate`."""
+
+    def __init__(self, white, black, a_color, pair, opening=""):
+        self.board = chess.Board()
+        for uci in opening.split():
+            self.board.push_uci(uci)
+        # ``searches[chess.WHITE]`` plays White; both trees persist all game.
+        self.searches = {chess.WHITE: white, chess.BLACK: black}
+        self.a_color = a_color
+        self.pair = pair
+        self.plies = 0
+
+    @property
+    def mcts(self):
+        return self.searches[self.board.turn]
+
+
 def evaluate(
     net_a,
     net_b,
     num_games: int = 10,
     num_simulations: int = Config.NUM_SIMULATIONS,
     max_moves: int | None = None,
+    concurrent_games: int = Config.EVAL_CONCURRENT_GAMES,
+    batch_size: int = Config.MCTS_BATCH_SIZE,
+    openings=OPENINGS,
+    stop_early: bool = False,
 ):
-    """Play ``num_games`` games between ``net_a`` and ``net_b``.
+    """Play up to ``num_games`` games between ``net_a`` and ``net_b``.
+
+    Games come in pairs that start from the same opening with colours
+    swapped, cycling through ``openings``. Up to ``concurrent_games`` games
+    run in lockstep: every round each game searches for the side to move,
+    and the leaves of all searches using the same network are evaluated in
+    one forward pass. Each game keeps one :class:`MCTS` per side, so
+    subtrees are reused from move to move.
 
     Parameters
     ----------
@@ -26,34 +87,185 @@ def evaluate(
     max_moves : int or None, optional
         If given, terminate games after this many half-moves (plies) and
         count them as draws.
+    concurrent_games : int, optional
+        Games played at the same time.
+    batch_size : int, optional
+        Leaves each search selects per round.
+    openings : list of str, optional
+        Opening lines as space-separated UCI moves; empty for the initial
+        position only.
+    stop_early : bool, optional
+        End the match as soon as :func:`sprt_pentanomial` reaches a
+        verdict on the finished pairs; games still running are dropped.
+
+    Returns
+    -------
+    dict
+        ``wins``, ``losses`` and ``draws`` from ``net_a``'s point of view and
+        ``pairs``, the pentanomial counts of finished pairs scoring 0, 0.5,
+        1, 1.5 and 2 points for ``net_a``.
     """
 
-    stats = {"wins": 0, "losses": 0, "draws": 0}
-    for g in range(num_games):
-        env = GameEnvironment()
-        current_player = 1
-        nets = [net_a.to(Config.DEVICE), net_b.to(Config.DEVICE)]
-        move_counter = 0
-        while True:
-            net = nets[0] if env.board.turn == chess.WHITE else nets[1]
-            mcts = MCTS(net, num_simulations=num_simulations)
-            visit_counts = mcts.run(env.board)
-            best_move_idx = max(visit_counts, key=visit_counts.get)
-            move = index_to_move(best_move_idx)
-            _, reward, done = env.step(move)
-            move_counter += 1
-            if not done and (max_moves is not None and move_counter >= max_moves):
-                reward = 0  # treat as draw when exceeding move limit
-                done = True
-            if done:
-                if reward == 1:
-                    stats["wins"] += 1 if env.board.turn == chess.BLACK else 0
-                    stats["losses"] += 1 if env.board.turn == chess.WHITE else 0
-                elif reward == -1:
-                    stats["losses"] += 1 if env.board.turn == chess.BLACK else 0
-                    stats["wins"] += 1 if env.board.turn == chess.WHITE else 0
-                else:
-                    stats["draws"] += 1
-                break
-            current_player *= -1
+    stats = {"wins": 0, "losses": 0, "draws": 0, "pairs": [0] * 5}
+    sides = [(NetworkEvaluator(net), EvalCache()) for net in (net_a, net_b)]
+    openings = list(openings) or [""]
+    # net_a's points in the finished games of unfinished pairs.
+    pair_points = {}
+
+    def new_game(index):
+        # Moves are picked by visit count, so stopping once the best move
+        # is decided does not change play.
+        search_a, search_b = (
+            MCTS(
+                evaluator,
+                num_simulations=num_simulations,
+                batch_size=batch_size,
+                eval_cache=cache,
+                early_stop=True,
+            )
+            for evaluator, cache in sides
+        )
+        pair, second = divmod(index, 2)
+        opening = openings[pair % len(openings)]
+        if second:
+            return _MatchGame(search_b, search_a, chess.BLACK, pair, opening)
+        return _MatchGame(search_a, search_b, chess.WHITE, pair, opening)
+
+    games = [new_game(i) for i in range(min(num_games, concurrent_games))]
+    started = len(games)
+    while games:
+        for game in games:
+            game.mcts.start(game.board)
+        searching = [g for g in games if g.mcts.remaining]
+        while searching:
+            # net_a's searches share an evaluator and cache, as do net_b's.
+            for a_to_move in (True, False):
+                group = [g.mcts for g in searching if (g.board.turn == g.a_color) == a_to_move]
+                if not group:
+                    continue
+                lookups = [mcts.collect() for mcts in group]
+                results = group[0].resolve([lk for part in lookups for lk in part])
+                start = 0
+                for mcts, part in zip(group, lookups):
+                    mcts.apply(results[start : start + len(part)])
+                    start += len(part)
+            searching = [g for g in searching if g.mcts.remaining]
+
+        running = []
+        for game in games:
+            visit_counts = game.mcts.visit_counts()
+            game.board.push(index_to_move(max(visit_counts, key=visit_counts.get)))
+            game.plies += 1
+            if game.board.is_game_over():
+                result = _RESULT_VALUE.get(game.board.result(), 0)
+            elif max_moves is not None and game.plies >= max_moves:
+                result = 0  # treat as draw when exceeding move limit
+            else:
+                running.append(game)
+                continue
+            if game.a_color == chess.BLACK:
+                result = -result
+            stats[{1: "wins", -1: "losses", 0: "draws"}[result]] += 1
+            points = pair_points.pop(game.pair, None)
+            if points is None:
+                pair_points[game.pair] = (result + 1) / 2
+            else:
+                stats["pairs"][int(2 * (points + (result + 1) / 2))] += 1
+                if stop_early and sprt_pentanomial(stats["pairs"]) is not None:
+                    return stats
+            if started < num_games:
+                running.append(new_game(started))
+                started += 1
+        games = running
     return stats
+
+
+def score_to_elo(score: float) -> float:
+    """Elo difference implied by an expected score in ``[0, 1]``."""
+    score = min(max(score, 1e-3), 1.0 - 1e-3)
+    return -400.0 * math.log10(1.0 / score - 1.0)
+
+
+def expected_score(elo: float) -> float:
+    """Return the expected score of a player ``elo`` points stronger than its opponent."""
+    return 1.0 / (1.0 + 10.0 ** (-elo / 400.0))
+
+
+def _llr(counts, scores, elo0: float, elo1: float) -> float:
+    """Log-likelihood ratio of ``elo1`` over ``elo0`` for outcome ``counts``.
+
+    ``scores`` are the points of each outcome scaled to ``[0, 1]``. Uses the
+    normal approximation of the generalized SPRT with the empirical
+    variance. Every outcome starts with half a pseudo-observation, so a
+    handful of one-sided results cannot decide the test on their own.
+    """
+    counts = np.asarray(counts, dtype=np.float64) + 0.5
+    scores = np.asarray(scores, dtype=np.float64)
+    n = counts.sum()
+    mean = (counts * scores).sum() / n
+    var = (counts * (scores - mean) ** 2).sum() / n
+    s0, s1 = expected_score(elo0), expected_score(elo1)
+    return n * (s1 - s0) * (2 * mean - s0 - s1) / (2 * var)
+
+
+def _sprt_verdict(llr: float, alpha: float, beta: float):
+    if llr >= math.log((1 - beta) / alpha):
+        return True
+    if llr <= math.log(beta / (1 - alpha)):
+        return False
+    return None
+
+
+def sprt(
+    wins,
+    losses,
+    draws,
+    elo0: float = Config.SPRT_ELO0,
+    elo1: float = Config.SPRT_ELO1,
+    alpha: float = Config.SPRT_ALPHA,
+    beta: float = Config.SPRT_BETA,
+):
+    """Sequential probability ratio test for Elo on single game results.
+
+    Returns ``True`` when ``elo1`` is accepted, ``False`` when ``elo0`` is
+    accepted and ``None`` while the test is undecided.
+    """
+    llr = _llr([losses, draws, wins], [0.0, 0.5, 1.0], elo0, elo1)
+    return _sprt_verdict(llr, alpha, beta)
+
+
+def sprt_pentanomial(
+    pairs,
+    elo0: float = Config.SPRT_ELO0,
+    elo1: float = Config.SPRT_ELO1,
+    alpha: float = Config.SPRT_ALPHA,
+    beta: float = Config.SPRT_BETA,
+):
+    """Like :func:`sprt` for game pairs with swapped colours.
+
+    ``pairs`` counts the pairs in which the tested side scored 0, 0.5, 1,
+    1.5 and 2 points. Treating a pair as one observation accounts for the
+    correlation between two games from the same opening.
+    """
+    llr = _llr(pairs, [0.0, 0.25, 0.5, 0.75, 1.0], elo0, elo1)
+    return _sprt_verdict(llr, alpha, beta)
+
+
+def match_summary(stats: dict) -> dict:
+    """Derive win rate, score, Elo and the SPRT verdict from match ``stats``.
+
+    The verdict uses the pentanomial test when ``stats`` has ``pairs``.
+    """
+    games = stats["wins"] + stats["losses"] + stats["draws"]
+    score = (stats["wins"] + 0.5 * stats["draws"]) / games if games else 0.5
+    if "pairs" in stats:
+        verdict = sprt_pentanomial(stats["pairs"])
+    else:
+        verdict = sprt(stats["wins"], stats["losses"], stats["draws"])
+    return {
+        "games": games,
+        "win_rate": stats["wins"] / games if games else 0.0,
+        "score": score,
+        "elo": score_to_elo(score),
+        "sprt": {True: "accept", False: "reject", None: "continue"}[verdict],
+    }
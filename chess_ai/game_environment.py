@@ -1,6 +1,31 @@
 import chess
 import numpy as np
 
+# Order of the twelve piece planes: white pieces first, then black, each in
+# ``GameEnvironment.PIECE_TO_IDX`` order.
+_PLANE_PIECES = [
+    (color, piece_type)
+    for color in (chess.WHITE, chess.BLACK)
+    for piece_type in (
+        chess.PAWN,
+        chess.ROOK,
+        chess.KNIGHT,
+        chess.BISHOP,
+        chess.QUEEN,
+        chess.KING,
+    )
+]
+
+
+# Words in a packed state: 12 piece bitboards, the en-passant mask and flags.
+PACKED_STATE_WORDS = 14
+
+
+def _unpack_bitboards(masks: np.ndarray) -> np.ndarray:
+    """Expand ``(..., k)`` uint64 bitboards to ``(..., k, 8, 8)`` uint8 planes."""
+    bits = np.unpackbits(masks.astype("<u8").view(np.uint8), bitorder="little")
+    return bits.reshape(masks.shape + (8, 8))
+
 
 class GameEnvironment:
     """Wrapper around python-chess for board management and encoding."""
@@ -15,25 +40,40 @@ class GameEnvironment:
         chess.KING: 5,
     }
 
-    def __init__(self):
+    def __init__(self, incremental: bool = False):
         self.board = chess.Board()
+        # With ``incremental`` the encoded planes are kept up to date by
+        # ``step``/``undo`` instead of being rebuilt for every state.
+        self._planes = self.encode_board(self.board) if incremental else None
 
-    def reset(self):
-        if hasattr(self.board, "reset"):
+    def reset(self, board: chess.Board | None = None):
+        """Start a new game, from a copy of ``board`` if given, and return its state."""
+        if board is not None:
+            self.board = board.copy()
+        elif hasattr(self.board, "reset"):
             self.board.reset()
         else:
             # Fallback for older python-chess versions
             self.board.reset_board()
+        if self._planes is not None:
+            self.encode_board(self.board, out=self._planes)
         return self.get_state()
 
     def get_state(self):
+        if self._planes is not None:
+            return self._planes.copy()
         return self.encode_board(self.board)
 
     def legal_moves(self):
         return list(self.board.legal_moves)
 
     def step(self, move):
-        self.board.push(move)
+        if self._planes is not None:
+            squares = self._touched_squares(move)
+            self.board.push(move)
+            self._refresh(squares)
+        else:
+            self.board.push(move)
         done = self.board.is_game_over()
         reward = 0.0
         if done:
@@ -47,7 +87,42 @@ class GameEnvironment:
         return self.get_state(), reward, done
 
     def undo(self):
-        self.board.pop()
+        move = self.board.pop()
+        if self._planes is not None:
+            self._refresh(self._touched_squares(move))
+
+    def _touched_squares(self, move: chess.Move):
+        """Squares whose contents differ before and after ``move``.
+
+        Must be called with the position from which ``move`` is played.
+        """
+        squares = [move.from_square, move.to_square]
+        if self.board.is_castling(move):
+            rank = chess.square_rank(move.from_square)
+            if self.board.is_kingside_castling(move):
+                squares += [chess.square(7, rank), chess.square(5, rank)]
+            else:
+                squares += [chess.square(0, rank), chess.square(3, rank)]
+            # Chess960-style encodings put the king's target on the rook.
+            squares += [chess.square(6, rank), chess.square(2, rank)]
+        elif self.board.is_en_passant(move):
+            squares.append(chess.square(
+                chess.square_file(move.to_square), chess.square_rank(move.from_square)
+            ))
+        return squares
+
+    def _refresh(self, squares):
+        """Re-encode ``squares`` and the non-piece planes in place."""
+        planes = self._planes
+        board = self.board
+        for square in squares:
+            row, col = divmod(square, 8)
+            planes[:12, row, col] = 0
+            piece = board.piece_at(square)
+            if piece is not None:
+                offset = 0 if piece.color == chess.WHITE else 6
+                planes[offset + self.PIECE_TO_IDX[piece.piece_type], row, col] = 1
+        self._encode_flags(board, planes)
 
     def is_quiet_move(self, move: chess.Move) -> bool:
         """Return True if ``move`` is non-capturing, non-checking and current
@@ -58,24 +133,91 @@ class GameEnvironment:
             and not self.board.is_check()
         )
 
-    @classmethod
-    def encode_board(cls, board: chess.Board):
-        """Encode board into an 8x8x18 tensor of binary features."""
-        planes = np.zeros((cls.NUM_CHANNELS, 8, 8), dtype=np.float32)
-        piece_map = board.piece_map()
-        for square, piece in piece_map.items():
-            row = square // 8
-            col = square % 8
-            offset = 0 if piece.color == chess.WHITE else 6
-            piece_idx = cls.PIECE_TO_IDX[piece.piece_type]
-            planes[offset + piece_idx][row][col] = 1
-        planes[12][:] = int(board.turn)
-        planes[13][:] = int(board.has_kingside_castling_rights(chess.WHITE))
-        planes[14][:] = int(board.has_queenside_castling_rights(chess.WHITE))
-        planes[15][:] = int(board.has_kingside_castling_rights(chess.BLACK))
-        planes[16][:] = int(board.has_queenside_castling_rights(chess.BLACK))
+    @staticmethod
+    def _encode_flags(board: chess.Board, planes):
+        """Fill the side-to-move, castling and en-passant planes."""
+        planes[12] = int(board.turn)
+        planes[13] = int(board.has_kingside_castling_rights(chess.WHITE))
+        planes[14] = int(board.has_queenside_castling_rights(chess.WHITE))
+        planes[15] = int(board.has_kingside_castling_rights(chess.BLACK))
+        planes[16] = int(board.has_queenside_castling_rights(chess.BLACK))
+        planes[17] = 0
         if board.ep_square is not None:
             row = board.ep_square // 8
             col = board.ep_square % 8
             planes[17][row][col] = 1
-        return planes
+
+    @classmethod
+    def encode_board(cls, board: chess.Board, out=None):
+        """Encode board into an 8x8x18 tensor of binary features.
+
+        The piece planes are unpacked from python-chess bitboards. ``out``
+        may be a preallocated float32 ``(18, 8, 8)`` array to write into.
+        """
+        if out is None:
+            out = np.empty((cls.NUM_CHANNELS, 8, 8), dtype=np.float32)
+        masks = np.array(
+            [board.pieces_mask(pt, color) for color, pt in _PLANE_PIECES],
+            dtype=np.uint64,
+        )
+        out[:12] = _unpack_bitboards(masks)
+        cls._encode_flags(board, out)
+        return out
+
+    @classmethod
+    def encode_boards(cls, boards, out=None):
+        """Encode a sequence of boards into a ``(n, 18, 8, 8)`` float32 array.
+
+        All piece planes are unpacked in one NumPy call. Pass ``out`` to
+        reuse a preallocated buffer with at least ``len(boards)`` rows.
+        """
+        return cls.unpack_states(cls.pack_boards(boards), out=out)
+
+    @staticmethod
+    def pack_boards(boards):
+        """Return the packed ``(n, 14)`` uint64 form of ``boards``.
+
+        Words 0-11 are the piece bitboards in plane order, word 12 is the
+        en-passant square mask and word 13 holds the side to move (bit 0)
+        and the four castling rights (bits 1-4) in plane order.
+        """
+        packed = np.empty((len(boards), PACKED_STATE_WORDS), dtype=np.uint64)
+        for i, board in enumerate(boards):
+            packed[i, :12] = [board.pieces_mask(pt, color) for color, pt in _PLANE_PIECES]
+            packed[i, 12] = chess.BB_SQUARES[board.ep_square] if board.ep_square is not None else 0
+            packed[i, 13] = (
+                int(board.turn)
+                | board.has_kingside_castling_rights(chess.WHITE) << 1
+                | board.has_queenside_castling_rights(chess.WHITE) << 2
+                | board.has_kingside_castling_rights(chess.BLACK) << 3
+                | board.has_queenside_castling_rights(chess.BLACK) << 4
+            )
+        return packed
+
+    @staticmethod
+    def pack_states(states):
+        """Pack encoded ``(..., 18, 8, 8)`` planes into ``(..., 14)`` uint64 words."""
+        states = np.asarray(states)
+        bits = states.reshape(states.shape[:-3] + (GameEnvironment.NUM_CHANNELS, 64)) != 0
+        masks = np.packbits(bits, axis=-1, bitorder="little").view("<u8")[..., 0]
+        packed = np.empty(states.shape[:-3] + (PACKED_STATE_WORDS,), dtype=np.uint64)
+        packed[..., :12] = masks[..., :12]
+        packed[..., 12] = masks[..., 17]
+        flags = bits[..., 12:17, 0].astype(np.uint64)
+        packed[..., 13] = (flags << np.arange(5, dtype=np.uint64)).sum(axis=-1)
+        return packed
+
+    @classmethod
+    def unpack_states(cls, packed, out=None):
+        """Decode packed ``(n, 14)`` states into ``(n, 18, 8, 8)`` float32 planes."""
+        packed = np.asarray(packed, dtype=np.uint64)
+        n = len(packed)
+        if out is None:
+            out = np.empty((n, cls.NUM_CHANNELS, 8, 8), dtype=np.float32)
+        out = out[:n]
+        planes = _unpack_bitboards(packed[:, :13])
+        out[:, :12] = planes[:, :12]
+        flags = (packed[:, 13:14] >> np.arange(5, dtype=np.uint64)) & np.uint64(1)
+        out[:, 12:17] = flags[:, :, None, None]
+        out[:, 17] = planes[:, 12]
+        return out
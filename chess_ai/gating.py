@@ -0,0 +1,179 @@
+"""Gating matches for new checkpoints, played outside the training loop."""
+
+import json
+import os
+import queue
+import shutil
+import time
+import traceback
+
+import torch
+import torch.multiprocessing as mp
+
+from .action_index import ACTION_SIZE
+from .config import Config
+from .evaluation import evaluate, match_summary
+from .game_environment import GameEnvironment
+from .network_manager import NetworkManager
+from .policy_value_net import PolicyValueNet
+
+RESULTS_FILE = "results.jsonl"
+BEST_FILE = "best.pt"
+
+
+def _load_network(manager: NetworkManager, path: str) -> PolicyValueNet:
+    net = PolicyValueNet(
+        GameEnvironment.NUM_CHANNELS,
+        ACTION_SIZE,
+        num_blocks=Config.NUM_RES_BLOCKS,
+        filters=Config.NUM_FILTERS,
+    ).to(Config.DEVICE)
+    manager.load(path, net)
+    net.eval()
+    return net
+
+
+def play_gating_match(
+    candidate: str,
+    reference: str,
+    games: int = Config.GATING_GAMES,
+    simulations: int = Config.GATING_SIMULATIONS,
+    max_moves: int | None = Config.GATING_MAX_MOVES,
+) -> dict:
+    """Play ``candidate`` against ``reference`` and return the result record.
+
+    The match ends after ``games`` games or once the SPRT decides. The
+    record holds both paths, the match ``stats`` and the fields of
+    :func:`match_summary`.
+    """
+    manager = NetworkManager(os.path.dirname(candidate) or ".")
+    stats = evaluate(
+        _load_network(manager, candidate),
+        _load_network(manager, reference),
+        num_games=games,
+        num_simulations=simulations,
+        max_moves=max_moves,
+        stop_early=True,
+    )
+    return {
+        "time": time.time(),
+        "candidate": candidate,
+        "reference": reference,
+        **stats,
+        **match_summary(stats),
+    }
+
+
+def _promote(checkpoint: str, best: str):
+    """Copy ``checkpoint`` over ``best`` without exposing a partial file."""
+    tmp = f"{best}.tmp"
+    shutil.copyfile(checkpoint, tmp)
+    os.replace(tmp, best)
+
+
+def _gating_worker(tasks, directory, games, simulations, max_moves, num_threads):
+    torch.set_num_threads(num_threads)
+    best = os.path.join(directory, BEST_FILE)
+    results = os.path.join(directory, RESULTS_FILE)
+    stop = False
+    while not stop:
+        candidate = tasks.get()
+        if candidate is None:
+            break
+        # Only the newest checkpoint is worth a match; skip superseded ones.
+        while True:
+            try:
+                newer = tasks.get_nowait()
+            except queue.Empty:
+                break
+            if newer is None:
+                stop = True
+                break
+            candidate = newer
+        try:
+            if not os.path.exists(best):
+                _promote(candidate, best)
+                continue
+            record = play_gating_match(candidate, best, games, simulations, max_moves)
+            if record["sprt"] == "accept":
+                _promote(candidate, best)
+        except Exception as exc:
+            # E.g. the candidate was pruned or is unreadable; keep serving.
+            record = {
+                "time": time.time(),
+                "candidate": candidate,
+                "reference": best,
+                "error": repr(exc),
+                "traceback": traceback.format_exc(),
+            }
+        with open(results, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+def read_results(directory: str = Config.GATING_DIR) -> list[dict]:
+    """Return all gating results published in ``directory``, oldest first."""
+    path = os.path.join(directory, RESULTS_FILE)
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class GatingWorker:
+    """Evaluate submitted checkpoints in a separate process.
+
+    Each checkpoint passed to :meth:`submit` plays a match against the
+    current best network in ``directory``. The result (stats, win rate,
+    score, Elo and SPRT verdict) is appended as one JSON line to
+    ``results.jsonl`` there; an accepted candidate replaces ``best.pt``.
+    The first checkpoint becomes the best one without a match. Checkpoints
+    that arrive while a match is running are skipped in favour of the
+    newest, so training never waits for evaluation however often it
+    submits. A candidate that cannot be played, e.g. because it was pruned,
+    gets a record with ``error`` instead of match results.
+    """
+
+    def __init__(
+        self,
+        directory: str = Config.GATING_DIR,
+        games: int = Config.GATING_GAMES,
+        simulations: int = Config.GATING_SIMULATIONS,
+        max_moves: int | None = Config.GATING_MAX_MOVES,
+        num_threads: int = Config.GATING_THREADS,
+    ):
+        self.directory = os.path.abspath(directory)
+        os.makedirs(directory, exist_ok=True)
+        ctx = mp.get_context("spawn")
+        self._tasks = ctx.Queue()
+        self._proc = ctx.Process(
+            target=_gating_worker,
+            args=(self._tasks, self.directory, games, simulations, max_moves, num_threads),
+            daemon=True,
+        )
+        self._proc.start()
+
+    def _check_alive(self):
+        if not self._proc.is_alive():
+            raise RuntimeError(f"Gating worker exited with code {self._proc.exitcode}")
+
+    def submit(self, checkpoint: str):
+        """Queue ``checkpoint`` for a gating match; returns immediately."""
+        self._check_alive()
+        self._tasks.put(os.path.abspath(checkpoint))
+
+    def results(self) -> list[dict]:
+        return read_results(self.directory)
+
+    def close(self, timeout: float | None = None):
+        """Finish the queued match and stop the worker process.
+
+        Raises ``RuntimeError`` if the worker had died or did not exit cleanly.
+        """
+        self._check_alive()
+        self._tasks.put(None)
+        self._proc.join(timeout)
+        if self._proc.is_alive():
+            self._proc.terminate()
+            self._proc.join()
+        if self._proc.exitcode != 0:
+            raise RuntimeError(f"Gating worker exited with code {self._proc.exitcode}")
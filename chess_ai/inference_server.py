@@ -0,0 +1,221 @@
+"""Central inference process serving many self-play workers.
+
+Workers share one network copy held by the server process. Clients write encoded
+positions and their legal action indices into per-client slots of shared
+memory tensors and announce them on a request queue; the server groups the
+requests of all clients into one batch, bounded by ``max_batch_size`` and a
+``max_latency_ms`` deadline, runs a single forward pass and writes the
+legal-move priors and values back into the client's slots.
+"""
+
+import os
+import queue
+import time
+
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+
+from .action_index import MAX_LEGAL_MOVES
+from .config import Config
+from .game_environment import GameEnvironment
+
+# Seconds a client waits for its response before checking the server.
+_RESPONSE_POLL_S = 1.0
+
+
+def _pid_alive(pid: int) -> bool:
+    """Whether process ``pid`` is still running (not exited or a zombie)."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except OSError:  # no procfs
+        return True
+
+
+def _serve(network, request_queue, response_queues, buffers, max_batch_size, max_latency, stopped):
+    try:
+        _serve_requests(
+            network, request_queue, response_queues, buffers, max_batch_size, max_latency
+        )
+    finally:
+        stopped.set()
+
+
+def _serve_requests(network, request_queue, response_queues, buffers, max_batch_size, max_latency):
+    states, moves, counts, priors_out, values_out = buffers
+    network = network.to(Config.DEVICE)
+    network.eval()
+    # A request that did not fit into the previous batch starts the next one.
+    held = None
+    while True:
+        request = held if held is not None else request_queue.get()
+        held = None
+        if request is None:
+            break
+        requests = [request]
+        pending = request[1]
+        deadline = time.monotonic() + max_latency
+        while pending < max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                request = request_queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if request is None:
+                request_queue.put(None)
+                break
+            if pending + request[1] > max_batch_size:
+                held = request
+                break
+            requests.append(request)
+            pending += request[1]
+
+        batch = torch.cat([states[client, :n] for client, n in requests])
+        with torch.no_grad():
+            log_p, v = network(batch.to(Config.DEVICE))
+        policies = torch.exp(log_p.float()).cpu()
+        values = v.view(-1).float().cpu()
+
+        row = 0
+        for client, n in requests:
+            idx = moves[client, :n].long()
+            valid = torch.arange(MAX_LEGAL_MOVES) < counts[client, :n].unsqueeze(1)
+            priors = torch.gather(policies[row : row + n], 1, idx) * valid
+            totals = priors.sum(dim=1, keepdim=True)
+            priors = torch.where(totals > 0, priors / totals, priors)
+            priors_out[client, :n] = priors
+            values_out[client, :n] = values[row : row + n]
+            row += n
+            response_queues[client].put(n)
+
+
+class InferenceClient:
+    """Evaluator handle for one worker process; pass it to :class:`MCTS`."""
+
+    def __init__(self, client_id, request_queue, response_queue, buffers, server_pid, stopped):
+        self.client_id = client_id
+        self.request_queue = request_queue
+        self.response_queue = response_queue
+        self.server_pid = server_pid
+        self.stopped = stopped
+        self.states, self.moves, self.counts, self.priors, self.values = buffers
+        self.capacity = self.states.shape[1]
+
+    def __call__(self, states: np.ndarray, moves):
+        all_priors, all_values = [], []
+        for start in range(0, len(states), self.capacity):
+            chunk = states[start : start + self.capacity]
+            chunk_moves = moves[start : start + self.capacity]
+            priors, values = self._evaluate(chunk, chunk_moves)
+            all_priors.extend(priors)
+            all_values.extend(values)
+        return all_priors, np.asarray(all_values, dtype=np.float32)
+
+    def _evaluate(self, states, moves):
+        n = len(states)
+        cid = self.client_id
+        self.states[cid, :n] = torch.from_numpy(states)
+        for i, m in enumerate(moves):
+            self.counts[cid, i] = len(m)
+            self.moves[cid, i, : len(m)] = torch.from_numpy(m.astype(np.int64))
+            self.moves[cid, i, len(m) :] = 0
+        self.request_queue.put((cid, n))
+        self._wait_response()
+        priors = self.priors[cid, :n].numpy()
+        values = self.values[cid, :n].numpy().copy()
+        return [priors[i, : len(m)].copy() for i, m in enumerate(moves)], values
+
+    def _wait_response(self):
+        """Block until the server answers; raise if it is gone."""
+        while True:
+            try:
+                return self.response_queue.get(timeout=_RESPONSE_POLL_S)
+            except queue.Empty:
+                if self.stopped.is_set() or not _pid_alive(self.server_pid):
+                    raise RuntimeError("Inference server is no longer running") from None
+
+
+class InferenceServer:
+    """Own a single network copy and evaluate positions for ``num_clients``.
+
+    Create the server in the parent process, hand ``client(i)`` to worker ``i``
+    and use it as the ``network`` argument of :class:`MCTS`.
+    """
+
+    def __init__(
+        self,
+        network,
+        num_clients: int,
+        max_batch_size: int = Config.INFERENCE_MAX_BATCH,
+        max_latency_ms: float = Config.INFERENCE_MAX_LATENCY_MS,
+        client_batch_size: int = Config.MCTS_BATCH_SIZE,
+    ):
+        if client_batch_size > max_batch_size:
+            raise ValueError(
+                f"client_batch_size {client_batch_size} exceeds max_batch_size {max_batch_size}"
+            )
+        ctx = mp.get_context("spawn")
+        self.num_clients = num_clients
+        self._request_queue = ctx.Queue()
+        self._response_queues = [ctx.Queue() for _ in range(num_clients)]
+        # Set when the server loop ends, so waiting clients can give up.
+        self._stopped = ctx.Event()
+        shape = (num_clients, client_batch_size)
+        self._buffers = (
+            torch.zeros(
+                shape + (GameEnvironment.NUM_CHANNELS, 8, 8), dtype=torch.float32
+            ).share_memory_(),
+            torch.zeros(shape + (MAX_LEGAL_MOVES,), dtype=torch.int64).share_memory_(),
+            torch.zeros(shape, dtype=torch.int64).share_memory_(),
+            torch.zeros(shape + (MAX_LEGAL_MOVES,), dtype=torch.float32).share_memory_(),
+            torch.zeros(shape, dtype=torch.float32).share_memory_(),
+        )
+        self._process = ctx.Process(
+            target=_serve,
+            args=(
+                network,
+                self._request_queue,
+                self._response_queues,
+                self._buffers,
+                max_batch_size,
+                max_latency_ms / 1000.0,
+                self._stopped,
+            ),
+            daemon=True,
+        )
+        self._process.start()
+
+    def client(self, client_id: int) -> InferenceClient:
+        return InferenceClient(
+            client_id,
+            self._request_queue,
+            self._response_queues[client_id],
+            self._buffers,
+            self._process.pid,
+            self._stopped,
+        )
+
+    def close(self):
+        if self._process is None:
+            return
+        self._request_queue.put(None)
+        self._process.join(timeout=10)
+        if self._process.is_alive():
+            self._process.terminate()
+        self._stopped.set()
+        self._process = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,83 +1,232 @@
 import os
-import pickle
 
 import lmdb
 import numpy as np
 
+from .action_index import MAX_LEGAL_MOVES, sparse_policy
 from .config import Config
+from .game_environment import PACKED_STATE_WORDS, GameEnvironment
+from .replay_buffer import SumTree, distinct_indices
+
+# Fixed part of a stored record. It is followed by ``count`` int16 action
+# indices and ``count`` float16 probabilities of the sparse policy.
+_RECORD_HEADER = np.dtype(
+    [
+        ("state", "<u8", (PACKED_STATE_WORDS,)),
+        ("value", "<f4"),
+        ("count", "<u2"),
+        ("reserved", "<u2"),
+    ]
+)
+_PRIORITY = np.dtype("<f4")
+
+
+def encode_record(state, policy, value) -> bytes:
+    """Serialize one position into the binary record layout."""
+    indices, probs = sparse_policy(policy, MAX_LEGAL_MOVES)
+    header = np.zeros((), dtype=_RECORD_HEADER)
+    header["state"] = GameEnvironment.pack_states(state)
+    header["value"] = value
+    header["count"] = len(indices)
+    return header.tobytes() + indices.astype("<i2").tobytes() + probs.astype("<f2").tobytes()
 
 
 class LMDBReplayBuffer:
-    """Replay buffer backed by LMDB for large datasets."""
+    """Replay buffer backed by LMDB for large datasets.
+
+    Records use the fixed binary layout of :func:`encode_record`: a packed
+    state (see :meth:`GameEnvironment.pack_states`), the value and a sparse
+    policy. Samples are read with ``np.frombuffer`` straight into
+    preallocated batch arrays and the states are decoded per batch.
+
+    Priorities live outside LMDB in a memory-mapped float32 file inside the
+    environment directory and feed an in-memory :class:`SumTree`, so
+    prioritized sampling costs O(batch log n) reads instead of one LMDB get
+    per stored entry. The file survives restarts; the tree is rebuilt from
+    it on open.
+
+    Several processes may open the same path, each with its own instance.
+    A writer reserves its slot range and writes the records, their
+    priorities and the ring counters in one LMDB write transaction, so
+    ranges never overlap and never become visible half written. Every
+    ``sample`` call reads from one read-only snapshot, which does not block
+    writers; before prioritized sampling the local sum tree picks up the
+    slots other processes wrote since the last call. Priorities changed
+    with :meth:`update_priorities` are only seen by other processes once
+    they reopen the buffer. The map grows automatically when it fills up.
+    """
 
     META_NEXT = b"next"
     META_SIZE = b"size"
+    # Total number of records ever written; lets readers find new slots.
+    META_WRITTEN = b"written"
+    PRIORITY_FILE = "priorities.f32"
 
     def __init__(self, path: str, capacity: int = Config.REPLAY_BUFFER_SIZE, map_size: int = 1 << 30):
-        self.env = lmdb.open(os.path.expanduser(path), map_size=map_size)
+        self.path = os.path.expanduser(path)
+        # Samples hit random pages, so OS readahead only wastes page cache.
+        self.env = lmdb.open(self.path, map_size=map_size, readahead=False)
         self.capacity = capacity
-        with self.env.begin(write=True) as txn:
+        with self._begin(write=True) as txn:
             if txn.get(self.META_NEXT) is None:
                 txn.put(self.META_NEXT, b"0")
                 txn.put(self.META_SIZE, b"0")
+            # Created under the write lock so concurrent openers agree on it.
+            self.priorities = self._open_priorities(txn)
+            self._synced = (
+                self._get_meta(txn, self.META_WRITTEN),
+                self._get_meta(txn, self.META_NEXT),
+            )
+        self._alpha = 0.6
+        self._tree = SumTree(capacity)
+        self._tree.rebuild(self.priorities.astype(np.float64) ** self._alpha)
+        # Slots of the last sampled batch, for ``update_priorities``.
+        self.last_indices = np.empty(0, dtype=np.int64)
+
+    def _open_priorities(self, txn):
+        """Map the priority file, creating or resizing it as needed."""
+        if txn.get(b"p0") is not None:
+            # Before the binary records, entries and priorities were pickled
+            # under ``d{i}``/``p{i}``; those records cannot be decoded.
+            raise ValueError(
+                f"{self.path} uses the old pickled record format, which is no longer "
+                "supported; regenerate the replay data"
+            )
+        file = os.path.join(self.path, self.PRIORITY_FILE)
+        nbytes = self.capacity * _PRIORITY.itemsize
+        if os.path.exists(file) and os.path.getsize(file) == nbytes:
+            return np.memmap(file, dtype=_PRIORITY, mode="r+", shape=(self.capacity,))
+        old = np.fromfile(file, dtype=_PRIORITY) if os.path.exists(file) else None
+        priorities = np.memmap(file, dtype=_PRIORITY, mode="w+", shape=(self.capacity,))
+        size = self._get_meta(txn, self.META_SIZE)
+        keep = 0
+        if old is not None:
+            keep = min(len(old), size)
+            priorities[:keep] = old[:keep]
+        priorities[keep:size] = 1.0
+        priorities.flush()
+        return priorities
+
+    def _begin(self, write: bool = False):
+        try:
+            return self.env.begin(write=write, buffers=True)
+        except lmdb.MapResizedError:
+            # Another process grew the map; adopt its size.
+            self.env.set_mapsize(0)
+            return self.env.begin(write=write, buffers=True)
+
+    @staticmethod
+    def _get_meta(txn, key: bytes) -> int:
+        val = txn.get(key)
+        return int(bytes(val).decode()) if val is not None else 0
 
     def _meta(self, key: bytes) -> int:
-        with self.env.begin() as txn:
-            val = txn.get(key)
-            return int(val.decode()) if val is not None else 0
+        with self._begin() as txn:
+            return self._get_meta(txn, key)
 
     def _set_meta(self, key: bytes, value: int):
-        with self.env.begin(write=True) as txn:
+        with self._begin(write=True) as txn:
             txn.put(key, str(value).encode())
 
     def add(self, state, policy, value, priority: float | None = None):
-        if priority is None:
-            priority = abs(value) + 1e-5
-        next_idx = self._meta(self.META_NEXT)
-        size = self._meta(self.META_SIZE)
-        with self.env.begin(write=True) as txn:
-            txn.put(f"d{next_idx}".encode(), pickle.dumps((state, policy, value)))
-            txn.put(f"p{next_idx}".encode(), pickle.dumps(priority))
-            next_idx = (next_idx + 1) % self.capacity
-            size = min(size + 1, self.capacity)
-            txn.put(self.META_NEXT, str(next_idx).encode())
-            txn.put(self.META_SIZE, str(size).encode())
+        self.add_many([(state, policy, value)], [priority])
+
+    def add_many(self, records, priorities=None):
+        """Write ``(state, policy, value)`` records in a single transaction.
+
+        The slot range is reserved by advancing the ring counters inside the
+        same transaction, so a whole game costs one commit and concurrent
+        writers never share slots. Returns the slots written.
+        """
+        if priorities is None:
+            priorities = [None] * len(records)
+        values = np.array([value for _, _, value in records], dtype=np.float32)
+        priorities = np.array(
+            [abs(v) + 1e-5 if p is None else p for v, p in zip(values, priorities)],
+            dtype=np.float32,
+        )
+        encoded = [encode_record(state, policy, value) for state, policy, value in records]
+        while True:
+            try:
+                with self._begin(write=True) as txn:
+                    slots = self._reserve(txn, len(encoded))
+                    for slot, record in zip(slots.tolist(), encoded):
+                        txn.put(f"d{slot}".encode(), record)
+                    # Written before the commit makes the slots visible.
+                    self.priorities[slots] = priorities
+                return slots
+            except lmdb.MapFullError:
+                self.env.set_mapsize(2 * self.env.info()["map_size"])
+
+    def _reserve(self, txn, count: int) -> np.ndarray:
+        """Advance the ring counters by ``count`` and return the slots."""
+        start = self._get_meta(txn, self.META_NEXT)
+        size = self._get_meta(txn, self.META_SIZE)
+        written = self._get_meta(txn, self.META_WRITTEN)
+        txn.put(self.META_NEXT, str((start + count) % self.capacity).encode())
+        txn.put(self.META_SIZE, str(min(size + count, self.capacity)).encode())
+        txn.put(self.META_WRITTEN, str(written + count).encode())
+        return (start + np.arange(count)) % self.capacity
+
+    def update_priorities(self, indices, priorities):
+        """Set new priorities for ``indices`` in the file and the sum tree."""
+        indices = np.asarray(indices, dtype=np.int64)
+        priorities = np.asarray(priorities, dtype=np.float32)
+        self.priorities[indices] = priorities
+        self._tree.update(indices, priorities.astype(np.float64) ** self._alpha)
+
+    def _sync_tree(self, txn, rebuild: bool = False):
+        """Load the priorities of slots written since the last call."""
+        written = self._get_meta(txn, self.META_WRITTEN)
+        last_written, last_next = self._synced
+        new = written - last_written
+        if new <= 0 and not rebuild:
+            return
+        if rebuild or new >= self.capacity:
+            self._tree.rebuild(self.priorities.astype(np.float64) ** self._alpha)
+        else:
+            slots = (last_next + np.arange(new)) % self.capacity
+            self._tree.update(slots, self.priorities[slots].astype(np.float64) ** self._alpha)
+        self._synced = (written, self._get_meta(txn, self.META_NEXT))
 
     def __len__(self) -> int:
         return self._meta(self.META_SIZE)
 
-    def _get_priorities(self, size):
-        priorities = np.empty(size, dtype=np.float32)
-        with self.env.begin() as txn:
-            for i in range(size):
-                data = txn.get(f"p{i}".encode())
-                if data is None:
-                    priorities[i] = 1e-5
-                else:
-                    priorities[i] = pickle.loads(data)
-        return priorities
-
-    def _load_batch(self, indices):
-        with self.env.begin() as txn:
-            batch = [pickle.loads(txn.get(f"d{i}".encode())) for i in indices]
-        states, policies, values = zip(*batch)
-        return states, policies, values
+    def _load_batch(self, txn, indices):
+        n = len(indices)
+        packed = np.empty((n, PACKED_STATE_WORDS), dtype=np.uint64)
+        values = np.empty(n, dtype=np.float32)
+        policy_idx = np.zeros((n, MAX_LEGAL_MOVES), dtype=np.int64)
+        policy_probs = np.zeros((n, MAX_LEGAL_MOVES), dtype=np.float32)
+        width = 0
+        offset = _RECORD_HEADER.itemsize
+        self.last_indices = np.asarray(indices, dtype=np.int64)
+        for row, i in enumerate(indices):
+            data = txn.get(f"d{i}".encode())
+            header = np.frombuffer(data, dtype=_RECORD_HEADER, count=1)[0]
+            packed[row] = header["state"]
+            values[row] = header["value"]
+            count = int(header["count"])
+            policy_idx[row, :count] = np.frombuffer(data, "<i2", count, offset)
+            policy_probs[row, :count] = np.frombuffer(data, "<f2", count, offset + 2 * count)
+            width = max(width, count)
+        states = GameEnvironment.unpack_states(packed)
+        return states, (policy_idx[:, :width], policy_probs[:, :width]), values
 
     def sample(self, batch_size):
-        size = len(self)
-        if batch_size > size:
-            raise ValueError("Batch size larger than buffer")
-        indices = np.random.choice(size, size=batch_size, replace=False)
-        indices = np.sort(indices)
-        return self._load_batch(indices)
+        with self._begin() as txn:
+            size = self._get_meta(txn, self.META_SIZE)
+            if batch_size > size:
+                raise ValueError("Batch size larger than buffer")
+            return self._load_batch(txn, distinct_indices(size, batch_size))
 
     def sample_prioritized(self, batch_size, alpha: float = 0.6):
-        size = len(self)
-        if batch_size > size:
-            raise ValueError("Batch size larger than buffer")
-        priorities = self._get_priorities(size)
-        probs = priorities ** alpha
-        probs /= probs.sum()
-        indices = np.random.choice(size, size=batch_size, p=probs)
-        indices = np.sort(indices)
-        return self._load_batch(indices)
+        with self._begin() as txn:
+            size = self._get_meta(txn, self.META_SIZE)
+            if batch_size > size:
+                raise ValueError("Batch size larger than buffer")
+            rebuild = alpha != self._alpha
+            self._alpha = alpha
+            self._sync_tree(txn, rebuild)
+            indices = np.sort(np.minimum(self._tree.sample(batch_size), size - 1))
+            return self._load_batch(txn, indices)
@@ -1,5 +1,4 @@
 import math
-from collections import defaultdict
 
 import numpy as np
 import torch
@@ -7,100 +6,410 @@ import chess
 
 from .config import Config
 from .game_environment import GameEnvironment
-from .action_index import move_to_index
+from .action_index import index_to_move, legal_move_indices, move_to_index
+from .eval_cache import EvalCache, position_key
+
+_NO_MOVES = np.empty(0, dtype=np.int32)
+_NO_STATS = np.empty(0, dtype=np.float32)
+
+
+def _legal_priors(policy: np.ndarray, moves: np.ndarray) -> np.ndarray:
+    """Restrict ``policy`` to ``moves`` and renormalize."""
+    priors = policy[moves].astype(np.float32)
+    total = priors.sum()
+    if total > 0:
+        priors /= total
+    return priors
 
 
 class MCTSNode:
-    def __init__(self, board: chess.Board, parent=None):
-        self.board = board
+    """Search tree node holding per-move statistics in flat arrays.
+
+    Slot ``i`` of ``P``, ``N``, ``W`` and ``Q`` belongs to the move with action
+    index ``moves[i]``; ``children`` maps slots to already created child nodes.
+    Nodes do not own a board: the search replays the path on a scratch board.
+    """
+
+    __slots__ = (
+        "parent",
+        "children",
+        "moves",
+        "P",
+        "N",
+        "W",
+        "Q",
+        "visit_total",
+        "is_expanded",
+        "terminal_value",
+    )
+
+    def __init__(self, parent=None):
         self.parent = parent
         self.children = {}
-        self.P = {}
-        self.N = defaultdict(int)
-        self.W = defaultdict(float)
-        self.Q = defaultdict(float)
+        self.moves = _NO_MOVES
+        self.P = self.N = self.W = self.Q = _NO_STATS
+        self.visit_total = 0.0
         self.is_expanded = False
+        # Set for finished games: result for the side to move.
+        self.terminal_value = None
 
-    def expand(self, policy, legal_moves):
-        """Expand the node by initializing children priors."""
-        if not legal_moves:
-            self.is_expanded = True
+    def expand(self, moves, priors):
+        """Expand the node with the legal ``moves`` and their normalized priors."""
+        self.is_expanded = True
+        if not len(moves):
             return
 
-        moves_idx = np.array([move_to_index(m) for m in legal_moves])
-        priors = policy[moves_idx].astype(float)
-        if priors.sum() > 0:
-            priors /= priors.sum()
-
-        for move, prior in zip(legal_moves, priors):
-            self.P[move] = float(prior)
-            self.N[move] = 0
-            self.W[move] = 0.0
-            self.Q[move] = 0.0
-        self.is_expanded = True
+        self.moves = moves
+        self.P = priors
+        self.N = np.zeros(len(self.moves), dtype=np.float32)
+        self.W = np.zeros(len(self.moves), dtype=np.float32)
+        self.Q = np.zeros(len(self.moves), dtype=np.float32)
 
     def select(self, c_puct):
-        total_visits = sum(self.N[m] for m in self.P)
-        best_move, best_score = None, -float('inf')
-        for move in self.P:
-            u = self.Q[move] + c_puct * self.P[move] * math.sqrt(total_visits) / (1 + self.N[move])
-            if u > best_score:
-                best_score = u
-                best_move = move
-        return best_move
+        """Return the slot with the highest PUCT score."""
+        u = self.Q + (c_puct * math.sqrt(self.visit_total)) * self.P / (1 + self.N)
+        return int(np.argmax(u))
 
+    def move(self, slot) -> chess.Move:
+        return index_to_move(int(self.moves[slot]))
 
-class MCTS:
-    def __init__(self, network, c_puct: float = Config.C_PUCT, num_simulations: int = Config.NUM_SIMULATIONS):
+    def add_virtual_loss(self, slot, virtual_loss):
+        """Make ``slot`` look visited and lost so parallel selections spread out."""
+        self.N[slot] += virtual_loss
+        self.W[slot] -= virtual_loss
+        self.Q[slot] = self.W[slot] / self.N[slot]
+        self.visit_total += virtual_loss
+
+    def backup(self, slot, value, virtual_loss=0.0):
+        """Record ``value`` for ``slot`` and revert any pending virtual loss."""
+        self.N[slot] += 1 - virtual_loss
+        self.W[slot] += value + virtual_loss
+        self.Q[slot] = self.W[slot] / self.N[slot]
+        self.visit_total += 1 - virtual_loss
+
+    def child(self, move: chess.Move):
+        """Return the expanded child reached by ``move`` or ``None``."""
+        slots = np.flatnonzero(self.moves == move_to_index(move))
+        if not len(slots):
+            return None
+        child = self.children.get(int(slots[0]))
+        if child is None or not child.is_expanded:
+            return None
+        return child
+
+    def visit_counts(self):
+        """Return ``{action_index: visits}`` for all legal moves."""
+        return dict(zip(self.moves.tolist(), self.N.astype(np.int64).tolist()))
+
+
+class NetworkEvaluator:
+    """Evaluate encoded positions with an in-process network.
+
+    Evaluators take a stacked ``(batch, channels, 8, 8)`` array and the legal
+    action indices of every position and return the normalized legal-move
+    priors and the values. :class:`MCTS` accepts any object with this call
+    signature in place of a network, e.g. an inference server client.
+    """
+
+    def __init__(self, network):
         self.network = network.to(Config.DEVICE)
+
+    def __call__(self, states: np.ndarray, moves):
+        state_tensor = torch.from_numpy(states).to(Config.DEVICE)
+        was_training = self.network.training
+        self.network.eval()
+        try:
+            with torch.no_grad():
+                log_p, v = self.network(state_tensor)
+        finally:
+            self.network.train(was_training)
+        policies = torch.exp(log_p).cpu().numpy()
+        values = v.view(-1).cpu().numpy()
+        priors = [_legal_priors(policy, m) for policy, m in zip(policies, moves)]
+        return priors, values
+
+
+class MCTS:
+    def __init__(
+        self,
+        network,
+        c_puct: float = Config.C_PUCT,
+        num_simulations: int = Config.NUM_SIMULATIONS,
+        batch_size: int = Config.MCTS_BATCH_SIZE,
+        virtual_loss: float = Config.VIRTUAL_LOSS,
+        eval_cache: EvalCache | None = None,
+        early_stop: bool = Config.MCTS_EARLY_STOP,
+        min_simulations: int = Config.MCTS_MIN_SIMULATIONS,
+        dominant_fraction: float | None = Config.MCTS_DOMINANT_FRACTION,
+        add_noise: bool = True,
+    ):
+        if isinstance(network, torch.nn.Module):
+            network = NetworkEvaluator(network)
+        self.evaluator = network
         self.c_puct = c_puct
         self.num_simulations = num_simulations
+        self.batch_size = max(1, batch_size)
+        self.virtual_loss = virtual_loss
+        # Stop once the most visited root move can no longer be overtaken, or
+        # (if ``dominant_fraction`` is set) once it holds that share of visits.
+        self.early_stop = early_stop
+        self.min_simulations = min_simulations
+        self.dominant_fraction = dominant_fraction
+        # Dirichlet noise at the root is for self-play exploration only.
+        self.add_noise = add_noise
+        # Simulations performed by the last ``run``/``start``.
+        self.last_simulations = 0
         # Cache board evaluations to avoid redundant network calls
-        self._eval_cache = {}
+        self._eval_cache = eval_cache if eval_cache is not None else EvalCache()
+        # Tree kept between calls so the next search starts from the subtree
+        # of the moves actually played. ``_root_board`` is the only board the
+        # search owns; simulations push and pop their path on it.
+        self._root = None
+        self._root_board = None
+        self._root_prior = None
+        # Leaves selected by ``collect`` awaiting ``apply``.
+        self._selections = []
+        self._pending = []
+
+    def reset(self):
+        """Discard the search tree, e.g. before starting a new game."""
+        self._root = None
+        self._root_board = None
+        self._root_prior = None
+
+    def advance(self, move: chess.Move):
+        """Promote the subtree of ``move`` to be the new root."""
+        child = self._root.child(move) if self._root is not None else None
+        if child is None:
+            self.reset()
+            return
+        child.parent = None
+        self._root = child
+        self._root_board.push(move)
+        self._root_prior = None
+
+    def _sync_root(self, board: chess.Board):
+        """Advance the stored tree along the moves played since the last search.
+
+        Any mismatch between the stored root and ``board`` drops the tree.
+        """
+        if self._root is None:
+            return
+        known = self._root_board.move_stack
+        played = board.move_stack
+        if played[: len(known)] != known:
+            self.reset()
+            return
+        for move in played[len(known) :]:
+            self.advance(move)
+            if self._root is None:
+                return
+        if self._root_board != board:
+            self.reset()
 
     def run(self, root_board: chess.Board):
-        root = MCTSNode(root_board.copy())
-        policy, _ = self._evaluate(root.board)
-        root.expand(policy, list(root.board.legal_moves))
-        moves = list(root.P.keys())
-        if moves:
-            noise = np.random.dirichlet([Config.DIRICHLET_ALPHA] * len(moves))
-            for idx, m in enumerate(moves):
-                root.P[m] = (1 - Config.DIRICHLET_EPSILON) * root.P[m] + Config.DIRICHLET_EPSILON * noise[idx]
-
-        for _ in range(self.num_simulations):
-            node = root
-            search_path = []
-            while node.is_expanded and node.P:
-                move = node.select(self.c_puct)
-                search_path.append((node, move))
-                if move not in node.children:
-                    node.board.push(move)
-                    child_board = node.board.copy()
-                    node.board.pop()
-                    node.children[move] = MCTSNode(child_board, parent=node)
-                node = node.children[move]
-
-            policy, value = self._evaluate(node.board)
-            node.expand(policy, list(node.board.legal_moves))
-            for parent, move in reversed(search_path):
-                parent.N[move] += 1
-                parent.W[move] += value
-                parent.Q[move] = parent.W[move] / parent.N[move]
+        """Search ``root_board`` and return ``{action_index: visits}``.
+
+        Visits already spent on the position in earlier searches count
+        towards ``num_simulations``. The number of simulations actually run
+        is stored in ``last_simulations``.
+        """
+        self.start(root_board)
+        while self.remaining:
+            self.apply(self.resolve(self.collect()))
+        return self.visit_counts()
+
+    def start(self, root_board: chess.Board):
+        """Set up the root for a search of ``root_board``.
+
+        Together with :meth:`collect`, :meth:`resolve` and :meth:`apply` this
+        lets a caller drive several searches in lockstep and evaluate their
+        leaves in one batch; :meth:`run` is the single-search loop over them.
+        """
+        self.last_simulations = 0
+        self._sync_root(root_board)
+        if self._root is None:
+            self._root_board = root_board.copy()
+            root = MCTSNode()
+            moves, priors, _ = self._evaluate(self._root_board)
+            root.expand(moves, priors)
+            self._root = root
+        root = self._root
+        if not len(root.moves) or not self.add_noise:
+            return
+        if self._root_prior is None:
+            self._root_prior = root.P
+        noise = np.random.dirichlet([Config.DIRICHLET_ALPHA] * len(root.moves))
+        root.P = (
+            (1 - Config.DIRICHLET_EPSILON) * self._root_prior
+            + Config.DIRICHLET_EPSILON * noise
+        ).astype(np.float32)
+
+    @property
+    def remaining(self) -> int:
+        """Simulations still needed at the root; 0 once the search is done."""
+        root = self._root
+        if root is None or not len(root.moves):
+            return 0
+        budget = max(0, self.num_simulations - int(root.visit_total))
+        if budget and self.early_stop and self.is_decided(budget):
+            return 0
+        return budget
+
+    def is_decided(self, budget: int) -> bool:
+        """Whether ``budget`` more simulations can no longer change the best move."""
+        root = self._root
+        if root.visit_total < self.min_simulations:
+            return False
+        if len(root.moves) == 1:
+            return True
+        second, best = np.partition(root.N, -2)[-2:]
+        if best - second > budget:
+            return True
+        return (
+            self.dominant_fraction is not None
+            and best >= self.dominant_fraction * root.visit_total
+        )
+
+    def visit_counts(self):
+        return self._root.visit_counts() if self._root is not None else {}
+
+    def principal_variation(self, max_depth: int = 10):
+        """Return the most visited line from the root as a list of moves."""
+        line = []
+        node = self._root
+        while node is not None and len(node.moves) and len(line) < max_depth:
+            slot = int(np.argmax(node.N))
+            if node.N[slot] <= 0:
+                break
+            line.append(node.move(slot))
+            node = node.children.get(slot)
+        return line
+
+    def root_value(self) -> float:
+        """Mean value of the most visited root move for the side to move."""
+        root = self._root
+        if root is None or not len(root.moves):
+            return 0.0
+        return float(root.Q[int(np.argmax(root.N))])
+
+    def _select_leaf(self, root, board: chess.Board):
+        """Walk from ``root`` to a leaf, pushing the path onto ``board``.
+
+        Virtual loss is applied along the path; the caller pops the moves.
+        """
+        node = root
+        search_path = []
+        while node.is_expanded and len(node.moves):
+            slot = node.select(self.c_puct)
+            node.add_virtual_loss(slot, self.virtual_loss)
+            search_path.append((node, slot))
+            board.push(node.move(slot))
+            child = node.children.get(slot)
+            if child is None:
+                child = node.children[slot] = MCTSNode(parent=node)
+            node = child
+        return node, search_path
+
+    def collect(self, batch_size: int | None = None):
+        """Select up to ``batch_size`` leaves and return their cache lookups.
+
+        Pass the lookups (possibly concatenated with those of other searches
+        sharing the evaluator and cache) to :meth:`resolve` and hand this
+        search's share of the results to :meth:`apply`.
+        """
+        if batch_size is None:
+            batch_size = self.batch_size
+        batch_size = min(batch_size, self.remaining)
+        root = self._root
+        board = self._root_board
+        selections = []
+        # Several selections may end in the same leaf; evaluate it only once.
+        pending = {}
+        lookups = []
+        for _ in range(batch_size):
+            node, search_path = self._select_leaf(root, board)
+            try:
+                if not node.is_expanded and id(node) not in pending:
+                    moves = legal_move_indices(board)
+                    terminal = self._terminal_value(board, moves)
+                    if terminal is not None:
+                        node.terminal_value = terminal
+                        node.expand(_NO_MOVES, _NO_STATS)
+                    else:
+                        pending[id(node)] = node
+                        lookups.append(self._lookup(board, moves))
+            finally:
+                for _ in search_path:
+                    board.pop()
+            selections.append((node, search_path))
+        self._selections = selections
+        self._pending = list(pending.values())
+        return lookups
+
+    def apply(self, results):
+        """Expand the collected leaves with ``results`` and back up the values."""
+        values = {}
+        for node, (moves, priors, value) in zip(self._pending, results):
+            node.expand(moves, priors)
+            values[id(node)] = value
+
+        for node, search_path in self._selections:
+            value = values.get(id(node), node.terminal_value)
+            for parent, slot in reversed(search_path):
                 value = -value
-        return {move_to_index(m): root.N[m] for m in root.P}
+                parent.backup(slot, value, self.virtual_loss)
+        self.last_simulations += len(self._selections)
+        self._selections = []
+        self._pending = []
+
+    @staticmethod
+    def _terminal_value(board: chess.Board, moves: np.ndarray):
+        """Return the result for the side to move if the game is over, else ``None``."""
+        if not len(moves):
+            return -1.0 if board.is_check() else 0.0
+        if (
+            board.is_insufficient_material()
+            or board.is_seventyfive_moves()
+            or board.is_fivefold_repetition()
+        ):
+            return 0.0
+        return None
 
     def _evaluate(self, board: chess.Board):
-        """Return policy and value for a board using the network with caching."""
-        fen = board.board_fen() + (" w" if board.turn == chess.WHITE else " b")
-        if fen not in self._eval_cache:
-            state_tensor = torch.tensor(
-                GameEnvironment.encode_board(board),
-                dtype=torch.float32,
-                device=Config.DEVICE,
-            ).unsqueeze(0)
-            with torch.no_grad():
-                log_p, v = self.network(state_tensor)
-            policy = torch.exp(log_p[0]).cpu().numpy()
-            self._eval_cache[fen] = (policy, v.item())
-        return self._eval_cache[fen]
+        """Return legal move indices, priors and value for ``board``."""
+        return self._evaluate_batch([board])[0]
+
+    def _evaluate_batch(self, boards):
+        """Evaluate ``boards`` with a single forward pass for all cache misses."""
+        return self.resolve([self._lookup(b) for b in boards])
+
+    def _lookup(self, board: chess.Board, moves: np.ndarray | None = None):
+        """Probe the cache for ``board``; encode it only on a miss."""
+        if moves is None:
+            moves = legal_move_indices(board)
+        key = position_key(board)
+        cached = self._eval_cache.get(key, moves)
+        state = GameEnvironment.encode_board(board) if cached is None else None
+        return key, moves, cached, state
+
+    def resolve(self, lookups):
+        """Turn cache lookups into ``(moves, priors, value)`` tuples."""
+        results = [None] * len(lookups)
+        missing = {}
+        for i, (key, moves, cached, state) in enumerate(lookups):
+            if cached is not None:
+                results[i] = (moves, *cached)
+            else:
+                missing.setdefault((key, moves.tobytes()), []).append(i)
+        if missing:
+            rows = list(missing.values())
+            states = np.stack([lookups[r[0]][3] for r in rows])
+            priors, values = self.evaluator(states, [lookups[r[0]][1] for r in rows])
+            for r, p, value in zip(rows, priors, values):
+                key, moves = lookups[r[0]][:2]
+                value = float(value)
+                for i in r:
+                    results[i] = (moves, p, value)
+                self._eval_cache.put(key, moves, p, value)
+        return results
@@ -3,7 +3,11 @@ from glob import glob
 
 import torch
 
+from .action_index import ACTION_SIZE
+from .checkpoint_writer import CheckpointWriter
 from .config import Config
+from .game_environment import GameEnvironment
+from .policy_value_net import PolicyValueNet
 
 
 def _unwrap(model):
@@ -23,11 +27,27 @@ def _fix_legacy_state_dict(state_dict: dict, prefix: str = "_orig_mod.") -> dict
 
 
 class NetworkManager:
-    def __init__(self, checkpoint_dir: str = Config.CHECKPOINT_DIR):
+    """Save and load checkpoints in ``checkpoint_dir``.
+
+    :meth:`save` returns right after copying the weights to CPU memory; the
+    file is written atomically in the background (see
+    :class:`CheckpointWriter`). Reads through this manager wait for its own
+    pending writes, other processes only ever see complete files.
+    """
+
+    def __init__(
+        self, checkpoint_dir: str = Config.CHECKPOINT_DIR, keep_last: int | None = None
+    ):
         self.checkpoint_dir = checkpoint_dir
         os.makedirs(self.checkpoint_dir, exist_ok=True)
+        self.writer = CheckpointWriter(keep_last)
+
+    def wait(self):
+        """Block until all saved checkpoints are on disk."""
+        self.writer.wait()
 
     def latest_checkpoint(self):
+        self.wait()
         files = glob(os.path.join(self.checkpoint_dir, "*.pt"))
         if not files:
             return None
@@ -36,17 +56,17 @@ class NetworkManager:
     def save(self, model, optimizer, name):
         path = os.path.join(self.checkpoint_dir, f"{name}.pt")
         base_model = _unwrap(model)
-        torch.save(
+        return self.writer.submit(
+            path,
             {
                 "model_state": base_model.state_dict(),
                 "optim_state": optimizer.state_dict(),
             },
-            path,
         )
-        return path
 
     def load(self, path, model, optimizer=None):
         """Load a checkpoint into ``model`` and optionally ``optimizer``."""
+        self.wait()
         try:
             # PyTorch 2.6+: explizit weights_only=False, damit auch Optimizer-States etc. geladen werden
             checkpoint = torch.load(
@@ -66,3 +86,17 @@ class NetworkManager:
         if optimizer and "optim_state" in checkpoint:
             optimizer.load_state_dict(checkpoint["optim_state"])
         return checkpoint
+
+
+def load_latest_network(manager: NetworkManager) -> PolicyValueNet:
+    """Return the newest checkpointed network, or a fresh one if none exists."""
+    net = PolicyValueNet(
+        GameEnvironment.NUM_CHANNELS,
+        ACTION_SIZE,
+        num_blocks=Config.NUM_RES_BLOCKS,
+        filters=Config.NUM_FILTERS,
+    )
+    ckpt = manager.latest_checkpoint()
+    if ckpt:
+        manager.load(ckpt, net)
+    return net
@@ -0,0 +1,100 @@
+"""Root-parallel MCTS: independent trees in worker processes."""
+
+from collections import Counter
+
+import chess
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+
+from .config import Config
+from .mcts import MCTS
+
+
+def _search_worker(conn, network, seed, mcts_kwargs):
+    """Serve ``run`` requests for one worker's private search tree."""
+    torch.set_num_threads(1)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+    mcts = MCTS(network, **mcts_kwargs)
+    while True:
+        board = conn.recv()
+        if board is None:
+            break
+        conn.send((mcts.run(board), mcts.last_simulations))
+    conn.close()
+
+
+class ParallelMCTS:
+    """Run the same root in ``num_workers`` processes and merge root visits.
+
+    Every worker keeps its own tree (reused across moves like :class:`MCTS`)
+    and its own Dirichlet noise seed. The simulation budget is split between
+    the workers so a move costs roughly ``1 / num_workers`` of the wall time.
+    """
+
+    def __init__(
+        self,
+        network,
+        num_workers: int = Config.MCTS_WORKERS,
+        c_puct: float = Config.C_PUCT,
+        num_simulations: int = Config.NUM_SIMULATIONS,
+        batch_size: int = Config.MCTS_BATCH_SIZE,
+        seed: int = Config.SEED,
+    ):
+        self.num_workers = max(1, num_workers)
+        self.num_simulations = num_simulations
+        # Simulations performed by all workers in the last ``run``.
+        self.last_simulations = 0
+        mcts_kwargs = {
+            "c_puct": c_puct,
+            "num_simulations": max(1, num_simulations // self.num_workers),
+            "batch_size": batch_size,
+        }
+        network.share_memory()
+        ctx = mp.get_context("spawn")
+        self._conns = []
+        self._procs = []
+        for rank in range(self.num_workers):
+            parent_conn, child_conn = ctx.Pipe()
+            proc = ctx.Process(
+                target=_search_worker,
+                args=(child_conn, network, seed + rank, mcts_kwargs),
+                daemon=True,
+            )
+            proc.start()
+            child_conn.close()
+            self._conns.append(parent_conn)
+            self._procs.append(proc)
+
+    def run(self, root_board: chess.Board):
+        """Search ``root_board`` in all workers and return summed visit counts."""
+        for conn in self._conns:
+            conn.send(root_board)
+        total = Counter()
+        self.last_simulations = 0
+        for conn in self._conns:
+            visits, simulations = conn.recv()
+            total.update(visits)
+            self.last_simulations += simulations
+        return dict(total)
+
+    def close(self):
+        for conn in self._conns:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            conn.close()
+        for proc in self._procs:
+            proc.join(timeout=5)
+            if proc.is_alive():
+                proc.terminate()
+        self._conns = []
+        self._procs = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
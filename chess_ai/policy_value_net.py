@@ -64,10 +64,11 @@ class PolicyValueNet(nn.Module):
             nn.Sequential(*self.res_blocks), 2, x, use_reentrant=False
         )
         p = F.relu(self.bn_policy(self.conv_policy(x)))
-        p = p.view(p.size(0), -1)
+        # ``flatten`` instead of ``view``: inputs may be channels_last.
+        p = torch.flatten(p, 1)
         p = F.log_softmax(self.fc_policy(p), dim=1)
         v = F.relu(self.bn_value(self.conv_value(x)))
-        v = v.view(v.size(0), -1)
+        v = torch.flatten(v, 1)
         v = F.relu(self.fc_value1(v))
         v = self.dropout(v)
         v = torch.tanh(self.fc_value2(v))
@@ -1,51 +1,183 @@
-from collections import deque
-
 import numpy as np
 
+from .action_index import MAX_LEGAL_MOVES, sparse_policy
 from .config import Config
+from .game_environment import PACKED_STATE_WORDS, GameEnvironment
+
+
+def distinct_indices(size: int, batch_size: int) -> np.ndarray:
+    """Draw ``batch_size`` distinct sorted integers below ``size``.
+
+    Duplicates are redrawn, so the cost depends on ``batch_size`` and not on
+    ``size`` as with ``np.random.choice(replace=False)``.
+    """
+    indices = np.unique(np.random.randint(size, size=batch_size))
+    while len(indices) < batch_size:
+        extra = np.random.randint(size, size=batch_size - len(indices))
+        indices = np.unique(np.concatenate([indices, extra]))
+    return indices
+
+
+class SumTree:
+    """Binary tree of priorities supporting O(log n) updates and sampling.
+
+    Leaves hold the priority of each slot; every inner node holds the sum of
+    its children, so the root is the total mass. All operations accept arrays
+    and walk the tree one level at a time for the whole batch.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._leaves = 1
+        while self._leaves < capacity:
+            self._leaves *= 2
+        self._tree = np.zeros(2 * self._leaves, dtype=np.float64)
+
+    @property
+    def total(self) -> float:
+        return float(self._tree[1])
+
+    def __getitem__(self, indices):
+        return self._tree[np.asarray(indices) + self._leaves]
+
+    def update(self, indices, priorities):
+        """Set the priority of ``indices`` and refresh their ancestors."""
+        if np.ndim(indices) == 0:
+            tree = self._tree
+            node = int(indices) + self._leaves
+            tree[node] = priorities
+            node //= 2
+            while node:
+                tree[node] = tree[2 * node] + tree[2 * node + 1]
+                node //= 2
+            return
+        nodes = np.asarray(indices, dtype=np.int64).reshape(-1) + self._leaves
+        if not len(nodes):
+            return
+        self._tree[nodes] = priorities
+        while nodes[0] > 1:
+            nodes = np.unique(nodes // 2)
+            self._tree[nodes] = self._tree[2 * nodes] + self._tree[2 * nodes + 1]
+
+    def rebuild(self, priorities):
+        """Replace all leaves with ``priorities`` and recompute every sum."""
+        self._tree[:] = 0.0
+        self._tree[self._leaves : self._leaves + len(priorities)] = priorities
+        node = self._leaves // 2
+        while node >= 1:
+            self._tree[node : 2 * node] = (
+                self._tree[2 * node : 4 * node : 2] + self._tree[2 * node + 1 : 4 * node : 2]
+            )
+            node //= 2
+
+    def find(self, targets) -> np.ndarray:
+        """Return the leaf index whose cumulative range contains each target."""
+        targets = np.array(targets, dtype=np.float64)
+        nodes = np.ones(len(targets), dtype=np.int64)
+        while nodes[0] < self._leaves:
+            left = self._tree[2 * nodes]
+            right = targets >= left
+            targets -= left * right
+            nodes = 2 * nodes + right
+        return np.minimum(nodes - self._leaves, self.capacity - 1)
+
+    def sample(self, batch_size: int) -> np.ndarray:
+        """Draw one leaf from each of ``batch_size`` equal slices of the mass."""
+        segment = self.total / batch_size
+        targets = (np.arange(batch_size) + np.random.random_sample(batch_size)) * segment
+        return self.find(targets)
 
 
 class ReplayBuffer:
+    """In-memory ring buffer over preallocated arrays.
+
+    States are stored in the packed 14-word form of
+    :meth:`GameEnvironment.pack_states`; policies as sparse
+    ``(indices, probs)`` rows of up to ``MAX_LEGAL_MOVES`` entries.
+    ``sample`` and ``sample_prioritized`` return decoded states, a padded
+    ``(indices, probs)`` policy pair and values as stacked arrays.
+    """
+
     def __init__(self, capacity: int = Config.REPLAY_BUFFER_SIZE):
-        self.buffer = deque(maxlen=capacity)
-        self.priorities = deque(maxlen=capacity)
+        self.capacity = capacity
+        self.states = np.zeros((capacity, PACKED_STATE_WORDS), dtype=np.uint64)
+        self.policy_indices = np.zeros((capacity, MAX_LEGAL_MOVES), dtype=np.int16)
+        self.policy_probs = np.zeros((capacity, MAX_LEGAL_MOVES), dtype=np.float16)
+        self.policy_sizes = np.zeros(capacity, dtype=np.int16)
+        self.values = np.zeros(capacity, dtype=np.float32)
+        self.priorities = np.zeros(capacity, dtype=np.float32)
+        self._tree = SumTree(capacity)
+        self._alpha = 0.6
+        # Slots of the last sampled batch, for ``update_priorities``.
+        self.last_indices = np.empty(0, dtype=np.int64)
+        self._next = 0
+        self._size = 0
 
     def add(self, state, policy, value, priority: float | None = None):
-        self.buffer.append((state, policy, value))
         if priority is None:
             priority = abs(value) + 1e-5
-        self.priorities.append(priority)
+        i = self._next
+        self.states[i] = GameEnvironment.pack_states(state)
+        indices, probs = sparse_policy(policy, MAX_LEGAL_MOVES)
+        self.policy_indices[i, : len(indices)] = indices
+        self.policy_indices[i, len(indices) :] = 0
+        self.policy_probs[i, : len(probs)] = probs
+        self.policy_probs[i, len(probs) :] = 0
+        self.policy_sizes[i] = len(indices)
+        self.values[i] = value
+        self.priorities[i] = priority
+        self._tree.update(i, priority**self._alpha)
+        self._next = (i + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def add_many(self, records, priorities=None):
+        """Add ``(state, policy, value)`` records, e.g. one finished game."""
+        if priorities is None:
+            priorities = [None] * len(records)
+        for (state, policy, value), priority in zip(records, priorities):
+            self.add(state, policy, value, priority)
 
     def sample(self, batch_size):
-        """Return a batch of samples from the buffer.
+        """Return a batch of distinct samples in ascending slot order.
 
-        Numpy indices are sorted before indexing so that usage with HDF5
-        datasets works without raising ``TypeError``.
+        Sorted indices keep usage with HDF5-style datasets possible.
         """
 
-        if batch_size > len(self.buffer):
+        if batch_size > len(self):
             raise ValueError("Batch size larger than buffer")
 
-        indices = np.random.choice(
-            len(self.buffer), size=batch_size, replace=False
-        )
-        indices = np.sort(indices)
-        batch = [self.buffer[i] for i in indices]
-        states, policies, values = zip(*batch)
-        return states, policies, values
+        return self._gather(distinct_indices(len(self), batch_size))
 
     def __len__(self):
-        return len(self.buffer)
+        return self._size
 
     def sample_prioritized(self, batch_size, alpha: float = 0.6):
-        """Sample a batch using prioritized experience replay."""
-        if batch_size > len(self.buffer):
+        """Sample a batch using prioritized experience replay.
+
+        One target is drawn from each of ``batch_size`` equal segments of the
+        total priority mass and located in the sum tree.
+        """
+        if batch_size > len(self):
             raise ValueError("Batch size larger than buffer")
-        priorities = np.array(self.priorities, dtype=np.float32)
-        probs = priorities ** alpha
-        probs /= probs.sum()
-        indices = np.random.choice(len(self.buffer), size=batch_size, p=probs)
-        indices = np.sort(indices)
-        batch = [self.buffer[i] for i in indices]
-        states, policies, values = zip(*batch)
-        return states, policies, values
+        if alpha != self._alpha:
+            self._alpha = alpha
+            self._tree.rebuild(self.priorities**alpha)
+        indices = np.sort(np.minimum(self._tree.sample(batch_size), len(self) - 1))
+        return self._gather(indices)
+
+    def update_priorities(self, indices, priorities):
+        """Set new priorities, e.g. from the latest TD or loss errors."""
+        indices = np.asarray(indices, dtype=np.int64)
+        priorities = np.asarray(priorities, dtype=np.float32)
+        self.priorities[indices] = priorities
+        self._tree.update(indices, priorities.astype(np.float64) ** self._alpha)
+
+    def _gather(self, indices):
+        self.last_indices = indices
+        states = GameEnvironment.unpack_states(self.states[indices])
+        width = int(self.policy_sizes[indices].max())
+        policies = (
+            self.policy_indices[indices, :width].astype(np.int64),
+            self.policy_probs[indices, :width].astype(np.float32),
+        )
+        return states, policies, self.values[indices]
@@ -0,0 +1,118 @@
+"""Streaming training batches from a replay buffer."""
+
+import queue
+import threading
+
+import numpy as np
+import torch
+from torch.utils.data import IterableDataset
+
+from .config import Config
+
+
+class ReplayDataset(IterableDataset):
+    """Endless stream of collated batches sampled from a replay buffer.
+
+    Each item is ``(states, policy_idx, policy_probs, values, indices)`` as
+    tensors, with the padded sparse policy of :meth:`ReplayBuffer.sample`
+    and the buffer slots of the batch. Pass those slots, not
+    ``buffer.last_indices``, to ``update_priorities``: with prefetching the
+    buffer has usually sampled ahead of the batch being trained on. The stream
+    never ends; the consumer decides how many batches to take. With an
+    :class:`LMDBReplayBuffer` it can also be handed to a ``DataLoader`` with
+    ``batch_size=None`` and worker processes.
+    """
+
+    def __init__(
+        self,
+        buffer,
+        batch_size: int = Config.BATCH_SIZE,
+        prioritized: bool = False,
+        alpha: float = 0.6,
+        pin_memory: bool = False,
+    ):
+        self.buffer = buffer
+        self.batch_size = batch_size
+        self.prioritized = prioritized
+        self.alpha = alpha
+        self.pin_memory = pin_memory
+
+    def sample(self):
+        if self.prioritized:
+            batch = self.buffer.sample_prioritized(self.batch_size, self.alpha)
+        else:
+            batch = self.buffer.sample(self.batch_size)
+        states, (policy_idx, policy_probs), values = batch
+        indices = np.array(self.buffer.last_indices, dtype=np.int64)
+        tensors = tuple(
+            torch.from_numpy(a) for a in (states, policy_idx, policy_probs, values, indices)
+        )
+        if self.pin_memory:
+            tensors = tuple(t.pin_memory() for t in tensors)
+        return tensors
+
+    def __iter__(self):
+        while True:
+            yield self.sample()
+
+
+class BatchPrefetcher:
+    """Pull items from ``iterable`` on a background thread.
+
+    Up to ``depth`` items are kept ready so the training loop never waits
+    for sampling and decoding. Exceptions raised by the producer are
+    re-raised by ``next``. The thread lives until :meth:`close`, which
+    waits for it to finish, so the source is not touched afterwards.
+    """
+
+    _DONE = object()
+
+    def __init__(self, iterable, depth: int = Config.PREFETCH_BATCHES):
+        self._queue = queue.Queue(maxsize=max(1, depth))
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._produce, args=(iter(iterable),), daemon=True
+        )
+        self._thread.start()
+
+    def _produce(self, iterator):
+        try:
+            for item in iterator:
+                if not self._put(item):
+                    return
+        except Exception as exc:  # forwarded to the consumer
+            self._put(exc)
+            return
+        self._put(self._DONE)
+
+    def _put(self, item) -> bool:
+        """Block until ``item`` is queued; return ``False`` once closed."""
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        item = self._queue.get()
+        if item is self._DONE:
+            self._queue.put(item)
+            raise StopIteration
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    def close(self):
+        """Stop the producer, wait for it and drop the prefetched items."""
+        self._stop.set()
+        self._thread.join()
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
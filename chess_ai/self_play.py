@@ -3,7 +3,8 @@ import numpy as np
 from prometheus_client import Counter
 
 from .game_environment import GameEnvironment
-from .mcts import MCTS
+from .eval_cache import EvalCache
+from .mcts import MCTS, NetworkEvaluator
 from .config import Config
 from .action_index import ACTION_SIZE, index_to_move
 
@@ -13,9 +14,32 @@ self_play_games_total = Counter(
 )
 
 
+def _sample_move(visit_counts, move_number):
+    """Pick a move from root visits; return its index and the policy target.
+
+    The target is sparse: an ``(indices, probs)`` pair over the root moves.
+    """
+    move_indices = np.fromiter(visit_counts.keys(), dtype=np.int32, count=len(visit_counts))
+    counts = np.fromiter(visit_counts.values(), dtype=np.float32, count=len(visit_counts))
+    temperature = 1.0 if move_number < 30 else 0.1
+    probs = counts ** (1.0 / temperature)
+    probs /= probs.sum()
+    chosen = np.random.choice(len(move_indices), p=probs)
+    return int(move_indices[chosen]), (move_indices, probs)
+
+
+def _outcome_records(trajectory, reward):
+    """Attach the game result to each stored ``(state, pi, player)`` entry.
+
+    ``reward`` is from White's point of view; ``z`` is from the point of view
+    of the player to move in ``state``.
+    """
+    return [(s, p, reward * player) for s, p, player in trajectory]
+
+
 def run_self_play(network, num_simulations: int = Config.NUM_SIMULATIONS):
     """Generate self-play data from games played by the network."""
-    env = GameEnvironment()
+    env = GameEnvironment(incremental=True)
     network = network.to(Config.DEVICE)
     mcts = MCTS(network, num_simulations=num_simulations)
     state = env.reset()
@@ -24,31 +48,88 @@ def run_self_play(network, num_simulations: int = Config.NUM_SIMULATIONS):
     move_number = 0
     while True:
         visit_counts = mcts.run(env.board)
-        counts = np.array([visit_counts[m] for m in visit_counts], dtype=np.float32)
-        move_indices = list(visit_counts.keys())
-        temperature = 1.0 if move_number < 30 else 0.1
-        probs = counts ** (1.0 / temperature)
-        probs /= probs.sum()
-        pi = np.zeros(ACTION_SIZE, dtype=np.float32)
-        for idx, p in zip(move_indices, probs):
-            pi[idx] = p
-        chosen = np.random.choice(len(move_indices), p=probs)
-        best_move_idx = move_indices[chosen]
+        best_move_idx, pi = _sample_move(visit_counts, move_number)
         move = index_to_move(best_move_idx)
         is_quiet = env.is_quiet_move(move)
         if not Config.FILTER_QUIET_POSITIONS or is_quiet:
             trajectory.append((state, pi, current_player))
         state, reward, done = env.step(move)
         if done:
-            for s, p, player in trajectory:
-                z = reward if player == current_player else -reward
-                yield s, p, z
+            yield from _outcome_records(trajectory, reward)
             self_play_games_total.inc()
             break
         current_player *= -1
         move_number += 1
 
 
+class _LockstepGame:
+    """State of one game inside :func:`run_self_play_batch`."""
+
+    def __init__(self, mcts):
+        self.env = GameEnvironment(incremental=True)
+        self.state = self.env.reset()
+        self.mcts = mcts
+        self.trajectory = []
+        self.current_player = 1
+        self.move_number = 0
+
+
+def run_self_play_batch(
+    network,
+    num_games: int,
+    num_simulations: int = Config.NUM_SIMULATIONS,
+    batch_size: int = Config.MCTS_BATCH_SIZE,
+):
+    """Play ``num_games`` self-play games in lockstep within one process.
+
+    Every round each unfinished game selects up to ``batch_size`` leaves; the
+    leaves of all games are evaluated in one forward pass. A list of
+    ``(state, pi, z)`` records, with sparse ``pi``, is yielded for each game as soon as it ends.
+    """
+    evaluator = NetworkEvaluator(network)
+    cache = EvalCache()
+    games = [
+        _LockstepGame(
+            MCTS(
+                evaluator,
+                num_simulations=num_simulations,
+                batch_size=batch_size,
+                eval_cache=cache,
+            )
+        )
+        for _ in range(num_games)
+    ]
+    while games:
+        for game in games:
+            game.mcts.start(game.env.board)
+        searching = [g for g in games if g.mcts.remaining]
+        while searching:
+            lookups = [g.mcts.collect() for g in searching]
+            results = searching[0].mcts.resolve([lk for part in lookups for lk in part])
+            start = 0
+            for game, part in zip(searching, lookups):
+                game.mcts.apply(results[start : start + len(part)])
+                start += len(part)
+            searching = [g for g in searching if g.mcts.remaining]
+
+        finished = []
+        for game in games:
+            env = game.env
+            best_move_idx, pi = _sample_move(game.mcts.visit_counts(), game.move_number)
+            move = index_to_move(best_move_idx)
+            if not Config.FILTER_QUIET_POSITIONS or env.is_quiet_move(move):
+                game.trajectory.append((game.state, pi, game.current_player))
+            game.state, reward, done = env.step(move)
+            if done:
+                finished.append(game)
+                self_play_games_total.inc()
+                yield _outcome_records(game.trajectory, reward)
+            else:
+                game.current_player *= -1
+                game.move_number += 1
+        games = [g for g in games if g not in finished]
+
+
 if __name__ == "__main__":
     """Run a short self-play demo when executed as a script."""
     from .policy_value_net import PolicyValueNet
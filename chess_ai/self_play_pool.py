@@ -0,0 +1,139 @@
+"""Multi-process self-play feeding a replay buffer."""
+
+import argparse
+import queue
+import traceback
+
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+
+from .config import Config
+from .network_manager import NetworkManager, load_latest_network
+from .self_play import run_self_play_batch
+
+
+def _self_play_worker(rank, network, num_games, num_simulations, lockstep_games, seed, out_queue):
+    """Play ``num_games`` games and put each finished game's records on ``out_queue``.
+
+    ``seed`` is this worker's own seed. A failure is reported as its
+    formatted traceback before the final ``None``.
+    """
+    try:
+        torch.set_num_threads(1)
+        np.random.seed(seed)
+        torch.manual_seed(seed)
+        remaining = num_games
+        while remaining > 0:
+            batch = min(lockstep_games, remaining)
+            for records in run_self_play_batch(
+                network, num_games=batch, num_simulations=num_simulations
+            ):
+                out_queue.put(records)
+            remaining -= batch
+    except BaseException:
+        out_queue.put(traceback.format_exc())
+        raise
+    finally:
+        out_queue.put(None)
+
+
+def _worker_seeds(seed: int | None, num_workers: int) -> list[int]:
+    """Spawn one independent seed per worker; ``None`` draws from OS entropy."""
+    children = np.random.SeedSequence(seed).spawn(num_workers)
+    return [int(child.generate_state(1)[0]) for child in children]
+
+
+def run_self_play_pool(
+    network,
+    buffer,
+    num_games: int,
+    num_workers: int = Config.SELF_PLAY_WORKERS,
+    num_simulations: int = Config.NUM_SIMULATIONS,
+    lockstep_games: int = Config.SELF_PLAY_LOCKSTEP_GAMES,
+    seed: int | None = None,
+):
+    """Generate ``num_games`` games in ``num_workers`` processes into ``buffer``.
+
+    The network weights are moved to shared memory once and mapped read-only
+    by every worker instead of being pickled per process. ``buffer`` is any
+    replay buffer with an ``add_many(records)`` method, e.g.
+    :class:`ReplayBuffer` or :class:`LMDBReplayBuffer`; each finished game is
+    written in one call. Returns the number of positions added. Raises
+    ``RuntimeError`` if any worker failed; games it finished before are kept.
+
+    Worker seeds are spawned from ``seed``; with the default ``None`` they
+    come from fresh OS entropy, so repeated runs play different games. Pass
+    a fixed ``seed`` to reproduce a run.
+    """
+    num_workers = max(1, min(num_workers, num_games))
+    seeds = _worker_seeds(seed, num_workers)
+    network.share_memory()
+    ctx = mp.get_context("spawn")
+    out_queue = ctx.Queue(maxsize=4 * num_workers)
+    procs = []
+    for rank in range(num_workers):
+        games = num_games // num_workers + (1 if rank < num_games % num_workers else 0)
+        proc = ctx.Process(
+            target=_self_play_worker,
+            args=(rank, network, games, num_simulations, lockstep_games, seeds[rank], out_queue),
+            daemon=True,
+        )
+        proc.start()
+        procs.append(proc)
+
+    positions = 0
+    errors = []
+    running = num_workers
+    while running:
+        try:
+            records = out_queue.get(timeout=1.0)
+        except queue.Empty:
+            if not any(p.is_alive() for p in procs):
+                break
+            continue
+        if records is None:
+            running -= 1
+            continue
+        if isinstance(records, str):
+            errors.append(records)
+            continue
+        buffer.add_many(records)
+        positions += len(records)
+    for proc in procs:
+        proc.join()
+    failed = [rank for rank, proc in enumerate(procs) if proc.exitcode != 0]
+    if errors or failed:
+        detail = errors[0] if errors else f"exit codes {[procs[r].exitcode for r in failed]}"
+        raise RuntimeError(f"Self-play workers {failed} failed:\n{detail}")
+    return positions
+
+
+if __name__ == "__main__":
+    from .lmdb_replay_buffer import LMDBReplayBuffer
+
+    parser = argparse.ArgumentParser(description="Run self-play in a process pool")
+    parser.add_argument("--games", type=int, default=Config.GAMES_PER_ITER, help="Number of games")
+    parser.add_argument(
+        "--workers", type=int, default=Config.SELF_PLAY_WORKERS, help="Worker processes"
+    )
+    parser.add_argument(
+        "--simulations", type=int, default=Config.NUM_SIMULATIONS, help="MCTS simulations"
+    )
+    parser.add_argument("--buffer", default=Config.REPLAY_DB_PATH, help="LMDB replay buffer path")
+    parser.add_argument(
+        "--seed", type=int, default=None, help="Seed for reproducible games (default: random)"
+    )
+    args = parser.parse_args()
+
+    net = load_latest_network(NetworkManager())
+    buf = LMDBReplayBuffer(args.buffer)
+    added = run_self_play_pool(
+        net,
+        buf,
+        args.games,
+        num_workers=args.workers,
+        num_simulations=args.simulations,
+        seed=args.seed,
+    )
+    print(f"Added {added} positions to {args.buffer}")
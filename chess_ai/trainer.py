@@ -1,13 +1,12 @@
 """Training utilities for the chess network."""
 
 import os
+import time
 
-import numpy as np
 import torch
 import torch.nn as nn
 from torch.amp import GradScaler, autocast
 from torch.optim.lr_scheduler import CosineAnnealingLR
-from torch.utils.data import DataLoader, TensorDataset
 from torch.utils.tensorboard import SummaryWriter
 
 try:
@@ -17,7 +16,9 @@ except Exception:  # pragma: no cover - optional dependency
 import wandb
 from tqdm.auto import tqdm
 
-from scripts.play_vs_ai import evaluate_against_previous
+from .checkpoint_writer import CheckpointWriter, write_checkpoint
+from .config import Config
+from .replay_dataset import BatchPrefetcher, ReplayDataset
 
 checkpoint_dir = "checkpoints"
 os.makedirs(checkpoint_dir, exist_ok=True)
@@ -31,19 +32,31 @@ def _unwrap(model):
     return model
 
 
-def save_checkpoint(epoch, model, optimizer, scaler):
+def save_checkpoint(epoch, model, optimizer, scaler, writer=None, on_saved=None):
+    """Save an epoch checkpoint, in the background when ``writer`` is given.
+
+    ``on_saved(path)`` is called once the file is complete, after the
+    confirmation is printed.
+    """
+
+    def saved(path):
+        print(f"⏺️ Checkpoint gespeichert: {path}")
+        if on_saved is not None:
+            on_saved(path)
+
     path = os.path.join(checkpoint_dir, f"ckpt_epoch{epoch}.pt")
     base_model = _unwrap(model)
-    torch.save(
-        {
-            "epoch": epoch,
-            "model_state": base_model.state_dict(),
-            "opt_state": optimizer.state_dict(),
-            "scaler_state": scaler.state_dict(),
-        },
-        path,
-    )
-    print(f"⏺️ Checkpoint gespeichert: {path}")
+    state = {
+        "epoch": epoch,
+        "model_state": base_model.state_dict(),
+        "opt_state": optimizer.state_dict(),
+        "scaler_state": scaler.state_dict(),
+    }
+    if writer is None:
+        write_checkpoint(path, state)
+        saved(path)
+    else:
+        writer.submit(path, state, saved)
 
 
 def load_checkpoint(path, model, optimizer, scaler):
@@ -56,9 +69,6 @@ def load_checkpoint(path, model, optimizer, scaler):
     return ckpt["epoch"] + 1
 
 
-from .config import Config
-
-
 class Trainer:
     def __init__(
         self,
@@ -69,9 +79,29 @@ class Trainer:
         epochs: int = 1,
         log_dir: str = Config.LOG_DIR,
         use_wandb: bool = False,
+        steps_per_epoch: int = Config.STEPS_PER_EPOCH,
+        accumulation_steps: int = 4,
+        num_threads: int | None = Config.TRAIN_THREADS,
+        num_interop_threads: int | None = Config.TRAIN_INTEROP_THREADS,
+        gating=None,
     ):
-        # 1) Auf GPU schieben …
-        self.network = network.to(Config.DEVICE)
+        self.device = Config.DEVICE
+        # CUDA trains in fp16 with loss scaling; CPU in bf16, which keeps the
+        # fp32 exponent range and needs no scaler.
+        self.amp_dtype = torch.float16 if self.device.type == "cuda" else torch.bfloat16
+        # 1) Auf GPU/CPU schieben …
+        self.network = network.to(self.device)
+        if self.device.type == "cpu":
+            if num_threads:
+                torch.set_num_threads(num_threads)
+            if num_interop_threads:
+                try:
+                    torch.set_interop_threads(num_interop_threads)
+                except RuntimeError:
+                    # Only settable before the first inter-op parallel work.
+                    pass
+            # oneDNN convolutions are fastest on NHWC tensors.
+            self.network = self.network.to(memory_format=torch.channels_last)
         # 2) TorchDynamo ohne Triton, mit aot_eager-Fallback:
         self.network = torch.compile(self.network, backend="aot_eager")
         if ORTModule is not None:
@@ -81,6 +111,16 @@ class Trainer:
         self.optimizer = optimizer
         self.batch_size = batch_size
         self.epochs = epochs
+        self.steps_per_epoch = steps_per_epoch
+        self.accumulation_steps = accumulation_steps
+        # Prefetch thread of the running ``train`` call.
+        self._batches = None
+        # Buffer slots of the batch trained on last, for priority updates.
+        self.last_indices = None
+        # Epoch checkpoints are written off the training thread.
+        self._checkpoints = CheckpointWriter()
+        # Optional ``GatingWorker`` that gets every epoch checkpoint.
+        self.gating = gating
         self.writer = SummaryWriter(log_dir)
         self.use_wandb = use_wandb
         if self.use_wandb:
@@ -88,31 +128,36 @@ class Trainer:
             wandb.watch(self.network)
 
     def train(self):
-        """Train the network using data from the replay buffer."""
+        """Train the network using data from the replay buffer.
+
+        Each epoch runs ``steps_per_epoch`` optimizer steps of
+        ``accumulation_steps`` batches. Batches stream from the buffer
+        through a background prefetch thread that only runs during this
+        call, so the buffer may be written between calls without racing
+        the sampler and no batch drawn before such writes is trained on.
+        The buffer slots of the last trained batch are kept in
+        ``last_indices``.
+        """
 
         if len(self.buffer) < self.batch_size:
             return
 
-        scaler = GradScaler(device_type="cuda")
-        accumulation_steps = 4
-
-        states, policies, values = self.buffer.sample(self.batch_size)
-        states_np = np.stack(states, axis=0)
-        states = torch.from_numpy(states_np).float()
-        policies = torch.tensor(policies, dtype=torch.float32)
-        values = torch.tensor(values, dtype=torch.float32)
-        dataset = TensorDataset(states, policies, values)
-        loader = DataLoader(
-            dataset,
-            batch_size=self.batch_size,
-            shuffle=True,
-            num_workers=os.cpu_count(),
-            pin_memory=True,
-            persistent_workers=True,
-            prefetch_factor=4,
+        scaler = GradScaler(self.device.type, enabled=self.amp_dtype == torch.float16)
+        accumulation_steps = self.accumulation_steps
+        batches_per_epoch = self.steps_per_epoch * accumulation_steps
+        self._batches = BatchPrefetcher(
+            ReplayDataset(self.buffer, self.batch_size, pin_memory=self.device.type == "cuda")
+        )
+        try:
+            self._train(scaler, accumulation_steps, batches_per_epoch)
+        finally:
+            self._batches.close()
+            self._batches = None
+
+    def _train(self, scaler, accumulation_steps, batches_per_epoch):
+        scheduler = CosineAnnealingLR(
+            self.optimizer, T_max=self.steps_per_epoch * self.epochs
         )
-
-        scheduler = CosineAnnealingLR(self.optimizer, T_max=len(loader) * self.epochs)
 
         start_epoch = 0
         if hasattr(Config, "RESUME_FROM") and Config.RESUME_FROM:
@@ -120,19 +165,27 @@ class Trainer:
                 Config.RESUME_FROM, self.network, self.optimizer, scaler
             )
 
+        memory_format = (
+            torch.channels_last if self.device.type == "cpu" else torch.contiguous_format
+        )
         for epoch in range(start_epoch, self.epochs):
             epoch_loss = 0.0
+            epoch_start = time.perf_counter()
             prog_bar = tqdm(
-                loader, desc=f"Epoch {epoch + 1}/{self.epochs}", unit="batch"
+                range(batches_per_epoch),
+                desc=f"Epoch {epoch + 1}/{self.epochs}",
+                unit="batch",
             )
             self.optimizer.zero_grad()
-            for batch_idx, (s, p_target, v_target) in enumerate(prog_bar):
-                s = s.cuda(non_blocking=True)
-                p_target = p_target.cuda(non_blocking=True)
-                v_target = v_target.cuda(non_blocking=True)
-                with autocast(device_type="cuda"):
+            for batch_idx in prog_bar:
+                s, p_idx, p_probs, v_target, self.last_indices = next(self._batches)
+                s = s.to(self.device, non_blocking=True, memory_format=memory_format)
+                p_idx = p_idx.to(self.device, non_blocking=True)
+                p_probs = p_probs.to(self.device, non_blocking=True)
+                v_target = v_target.to(self.device, non_blocking=True)
+                with autocast(device_type=self.device.type, dtype=self.amp_dtype):
                     log_p, v = self.network(s)
-                    loss_policy = -(p_target * log_p).sum(dim=1).mean()
+                    loss_policy = -(p_probs * log_p.gather(1, p_idx)).sum(dim=1).mean()
                     loss_value = torch.mean((v.view(-1) - v_target) ** 2)
                     loss = (loss_policy + loss_value) / accumulation_steps
 
@@ -144,24 +197,37 @@ class Trainer:
                     self.optimizer.zero_grad()
                     scheduler.step()
 
-                epoch_loss += loss.item() * accumulation_steps
-                global_step = epoch * len(loader) + batch_idx
-                self.writer.add_scalar(
-                    "Loss/train", loss.item() * accumulation_steps, global_step
-                )
-                prog_bar.set_postfix(loss=loss.item() * accumulation_steps)
-
-            avg_loss = epoch_loss / len(loader)
-            print(f"Epoch {epoch + 1}/{self.epochs} - loss {avg_loss:.4f}")
-            self.writer.add_scalar("loss", avg_loss, epoch)
-            if self.use_wandb:
-                wandb.log({"loss": avg_loss})
-
-            save_checkpoint(epoch, self.network, self.optimizer, scaler)
+                batch_loss = loss.item() * accumulation_steps
+                epoch_loss += batch_loss
+                global_step = epoch * batches_per_epoch + batch_idx
+                self.writer.add_scalar("Loss/train", batch_loss, global_step)
+                prog_bar.set_postfix(loss=batch_loss)
 
-            win_rate, elo_delta = evaluate_against_previous(
-                "nets/final_model.onnx", games=100, simulations=50
+            avg_loss = epoch_loss / batches_per_epoch
+            samples_per_sec = (
+                batches_per_epoch * self.batch_size / (time.perf_counter() - epoch_start)
             )
             print(
-                f"\U0001f4ca Evaluation Epoche {epoch}: Win-Rate={win_rate:.2%}, ΔElo={elo_delta:.1f}"
+                f"Epoch {epoch + 1}/{self.epochs} - loss {avg_loss:.4f}"
+                f" - {samples_per_sec:.0f} samples/s"
             )
+            self.writer.add_scalar("loss", avg_loss, epoch)
+            self.writer.add_scalar("samples_per_sec", samples_per_sec, epoch)
+            if self.use_wandb:
+                wandb.log({"loss": avg_loss, "samples_per_sec": samples_per_sec})
+
+            save_checkpoint(
+                epoch,
+                self.network,
+                self.optimizer,
+                scaler,
+                self._checkpoints,
+                self.gating.submit if self.gating is not None else None,
+            )
+
+    def close(self):
+        """Stop the background sampling thread and finish pending checkpoints."""
+        if self._batches is not None:
+            self._batches.close()
+            self._batches = None
+        self._checkpoints.wait()
@@ -0,0 +1,237 @@
+"""UCI front end for the MCTS engine with time management and pondering."""
+
+import math
+import sys
+import threading
+import time
+import traceback
+
+import chess
+
+from .config import Config
+from .mcts import MCTS
+from .network_manager import NetworkManager, load_latest_network
+
+ENGINE_NAME = "chess_ai MCTS"
+# Search budget when only the clock limits the search.
+UNLIMITED_SIMULATIONS = 10**9
+
+
+def value_to_cp(q: float) -> int:
+    """Map an expected score in ``[-1, 1]`` to centipawns for ``info score``."""
+    q = max(-0.999, min(0.999, q))
+    return int(round(111.71 * math.tan(1.562 * q)))
+
+
+def allocate_time(
+    limits: dict, turn: chess.Color, overhead_ms: float = Config.UCI_MOVE_OVERHEAD_MS
+):
+    """Return the seconds to spend on a move for ``go`` ``limits``, or ``None``."""
+    if "movetime" in limits:
+        return max(0.01, (limits["movetime"] - overhead_ms) / 1000.0)
+    time_key, inc_key = ("wtime", "winc") if turn == chess.WHITE else ("btime", "binc")
+    if time_key not in limits:
+        return None
+    time_left = limits[time_key]
+    moves_to_go = limits.get("movestogo", Config.UCI_MOVES_TO_GO)
+    budget = time_left / max(1, moves_to_go) + 0.75 * limits.get(inc_key, 0)
+    budget = min(budget, time_left / 2) - overhead_ms
+    return max(0.01, budget / 1000.0)
+
+
+def parse_go(tokens):
+    """Parse the arguments of a ``go`` command into a dict."""
+    limits = {}
+    i = 0
+    while i < len(tokens):
+        tok = tokens[i]
+        if tok in ("infinite", "ponder"):
+            limits[tok] = True
+        elif tok in ("wtime", "btime", "winc", "binc", "movestogo", "movetime", "nodes", "depth"):
+            if i + 1 < len(tokens):
+                limits[tok] = int(tokens[i + 1])
+                i += 1
+        i += 1
+    return limits
+
+
+def simulation_budget(limits: dict) -> int:
+    """Return the simulation budget for ``go`` ``limits``.
+
+    ``depth`` has no direct MCTS counterpart and is mapped to
+    ``Config.UCI_SIMULATIONS_PER_DEPTH`` simulations per ply.
+    """
+    budget = limits.get("nodes", UNLIMITED_SIMULATIONS)
+    if "depth" in limits:
+        budget = min(budget, max(1, limits["depth"]) * Config.UCI_SIMULATIONS_PER_DEPTH)
+    return budget
+
+
+def parse_position(tokens):
+    """Build a board from the arguments of a ``position`` command."""
+    moves = []
+    if "moves" in tokens:
+        split = tokens.index("moves")
+        tokens, moves = tokens[:split], tokens[split + 1 :]
+    if tokens and tokens[0] == "fen":
+        board = chess.Board(" ".join(tokens[1:]))
+    else:
+        board = chess.Board()
+    for uci in moves:
+        board.push_uci(uci)
+    return board
+
+
+class UCIEngine:
+    """Run MCTS searches on a background thread for the UCI protocol."""
+
+    def __init__(self, network, out=None, info_interval: float = 1.0):
+        self.mcts = MCTS(network, add_noise=False)
+        self.board = chess.Board()
+        self.out = out if out is not None else sys.stdout
+        self.info_interval = info_interval
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._ponderhit = threading.Event()
+
+    def send(self, line: str):
+        with self._lock:
+            self.out.write(line + "\n")
+            self.out.flush()
+
+    def handle(self, line: str) -> bool:
+        """Process one command; return ``False`` on ``quit``."""
+        tokens = line.split()
+        if not tokens:
+            return True
+        cmd, args = tokens[0], tokens[1:]
+        if cmd == "uci":
+            self.send(f"id name {ENGINE_NAME}")
+            self.send("option name Ponder type check default false")
+            self.send("uciok")
+        elif cmd == "isready":
+            self.send("readyok")
+        elif cmd == "ucinewgame":
+            self.stop()
+            self.mcts.reset()
+        elif cmd == "position":
+            self.stop()
+            self.board = parse_position(args)
+        elif cmd == "go":
+            self.stop()
+            self.go(parse_go(args))
+        elif cmd == "stop":
+            self.stop()
+        elif cmd == "ponderhit":
+            self._ponderhit.set()
+        elif cmd == "quit":
+            self.stop()
+            return False
+        return True
+
+    def go(self, limits: dict):
+        self._stop.clear()
+        self._ponderhit.clear()
+        self._thread = threading.Thread(
+            target=self._search, args=(self.board.copy(), limits), daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop a running search and wait for its ``bestmove``."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def wait(self):
+        """Block until the current search finishes on its own."""
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _search(self, board: chess.Board, limits: dict):
+        """Run one search and always answer with ``bestmove``.
+
+        If the search fails, the error is reported as ``info string`` and the
+        first legal move is played so the GUI is never left waiting.
+        """
+        line = []
+        try:
+            self._run_search(board, limits)
+            line = self.mcts.principal_variation(2)
+        except Exception as exc:
+            self.mcts.reset()
+            self.send(f"info string search failed: {exc!r}")
+            traceback.print_exc()
+        finally:
+            if not line:
+                line = list(board.legal_moves)[:1]
+            if not line:
+                self.send("bestmove 0000")
+            elif len(line) > 1:
+                self.send(f"bestmove {line[0].uci()} ponder {line[1].uci()}")
+            else:
+                self.send(f"bestmove {line[0].uci()}")
+
+    def _run_search(self, board: chess.Board, limits: dict):
+        mcts = self.mcts
+        mcts.num_simulations = simulation_budget(limits)
+        mcts.start(board)
+        start = time.monotonic()
+        last_info = start
+        pondering = limits.get("ponder", False)
+        infinite = limits.get("infinite", False)
+        budget = None if pondering or infinite else allocate_time(limits, board.turn)
+        deadline = start + budget if budget is not None else None
+
+        while not self._stop.is_set():
+            now = time.monotonic()
+            if pondering and self._ponderhit.is_set():
+                # The expected move was played: search on the normal clock.
+                pondering = False
+                budget = allocate_time(limits, board.turn)
+                deadline = now + budget if budget is not None else None
+            if deadline is not None and now >= deadline:
+                break
+            remaining = mcts.remaining
+            if remaining and deadline is not None and mcts.last_simulations >= mcts.min_simulations:
+                # Stop once the clock cannot buy enough visits to change the move.
+                nps = mcts.last_simulations / max(now - start, 1e-6)
+                remaining = min(remaining, int(nps * (deadline - now)))
+                if mcts.is_decided(remaining):
+                    break
+            if not remaining:
+                if pondering or infinite:
+                    # UCI forbids ``bestmove`` before ``stop``/``ponderhit``.
+                    self._stop.wait(0.01)
+                    continue
+                break
+            mcts.apply(mcts.resolve(mcts.collect()))
+            if now - last_info >= self.info_interval:
+                self._info(start)
+                last_info = now
+
+        self._info(start)
+
+    def _info(self, start: float):
+        elapsed = max(time.monotonic() - start, 1e-6)
+        nodes = self.mcts.last_simulations
+        pv = " ".join(m.uci() for m in self.mcts.principal_variation())
+        self.send(
+            f"info nodes {nodes} nps {int(nodes / elapsed)} time {int(elapsed * 1000)}"
+            f" score cp {value_to_cp(self.mcts.root_value())}" + (f" pv {pv}" if pv else "")
+        )
+
+
+def main(stream=None):
+    engine = UCIEngine(load_latest_network(NetworkManager()))
+    for line in stream if stream is not None else sys.stdin:
+        if not engine.handle(line.strip()):
+            break
+
+
+if __name__ == "__main__":
+    main()
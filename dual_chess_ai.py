@@ -141,10 +141,13 @@ class SelfPlayAgent:
         self.net = net
         self.simulations = simulations
         self.mcts_class = MCTS
+        # One search object per agent so the tree survives between moves.
+        self.mcts = self.mcts_class(
+            self.net, c_puct=4.0, num_simulations=self.simulations, early_stop=True
+        )
 
     def select_move(self, board: chess.Board) -> chess.Move:
-        mcts = self.mcts_class(self.net, c_puct=4.0, num_simulations=self.simulations)
-        visits = mcts.run(board)
+        visits = self.mcts.run(board)
         best_idx = max(visits, key=visits.get)
         from chess_ai.action_index import index_to_move
 
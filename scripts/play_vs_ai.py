@@ -12,6 +12,7 @@ from chess_ai.game_environment import GameEnvironment
 from chess_ai.policy_value_net import PolicyValueNet
 from chess_ai.action_index import ACTION_SIZE, index_to_move
 from chess_ai.mcts import MCTS
+from chess_ai.parallel_mcts import ParallelMCTS
 from chess_ai.network_manager import NetworkManager
 
 from chess_ai.evaluation import evaluate
@@ -81,29 +82,43 @@ def main(args):
     net = load_network(manager)
     env = GameEnvironment()
     ai_color = chess.BLACK if args.play_white else chess.WHITE
-    while True:
-        print(env.board)
-        if env.board.turn == ai_color:
-            mcts = MCTS(net, num_simulations=args.simulations)
-            visits = mcts.run(env.board)
-            best_idx = max(visits, key=visits.get)
-            move = index_to_move(best_idx)
-            print(f"AI plays: {move.uci()}")
-        else:
-            move_uci = input("Your move: ")
-            move = chess.Move.from_uci(move_uci)
-            if move not in env.board.legal_moves:
-                print("Illegal move, try again")
-                continue
-        _, _, done = env.step(move)
-        if done:
+    if args.workers > 1:
+        mcts = ParallelMCTS(net, num_workers=args.workers, num_simulations=args.simulations)
+    else:
+        mcts = MCTS(net, num_simulations=args.simulations, early_stop=True)
+    try:
+        while True:
             print(env.board)
-            print("Game over:", env.board.result())
-            break
+            if env.board.turn == ai_color:
+                visits = mcts.run(env.board)
+                best_idx = max(visits, key=visits.get)
+                move = index_to_move(best_idx)
+                print(f"AI plays: {move.uci()}")
+            else:
+                move_uci = input("Your move: ")
+                move = chess.Move.from_uci(move_uci)
+                if move not in env.board.legal_moves:
+                    print("Illegal move, try again")
+                    continue
+            _, _, done = env.step(move)
+            if done:
+                print(env.board)
+                print("Game over:", env.board.result())
+                break
+    finally:
+        # Stop the search worker processes even on errors or Ctrl-C.
+        if isinstance(mcts, ParallelMCTS):
+            mcts.close()
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Play against the trained AI")
     parser.add_argument("--play-white", action="store_true", help="Play as white instead of black")
     parser.add_argument("--simulations", type=int, default=Config.NUM_SIMULATIONS, help="MCTS simulations for AI moves")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=Config.MCTS_WORKERS,
+        help="Processes for root-parallel search",
+    )
     main(parser.parse_args())
@@ -1,13 +1,9 @@
 #!/usr/bin/env python
 """Minimal training harness for the chess AI."""
 
-
 import os
-import sys
 import subprocess
 
-
-
 import argparse
 import torch
 
@@ -15,15 +11,12 @@ from chess_ai.config import Config
 from chess_ai.game_environment import GameEnvironment
 from chess_ai.policy_value_net import PolicyValueNet
 from chess_ai.replay_buffer import ReplayBuffer
-from chess_ai.self_play import run_self_play
+from chess_ai.self_play_pool import run_self_play_pool
 from chess_ai.trainer import Trainer
 from chess_ai.action_index import ACTION_SIZE
 
 from chess_ai.network_manager import NetworkManager, _unwrap
-from chess_ai.evaluation import evaluate
-
-from chess_ai.network_manager import NetworkManager
-
+from chess_ai.evaluation import evaluate, match_summary
 
 
 def load_or_initialize_network(manager: NetworkManager):
@@ -48,56 +41,32 @@ def load_or_initialize_network(manager: NetworkManager):
     return net, optimizer
 
 
-def sprt(w, l, d, elo0=-5, elo1=5, alpha=0.05, beta=0.05):
-    """Simple sequential probability ratio test for Elo."""
-    import math
-
-    p0 = 1 / (1 + 10 ** (elo0 / 400))
-    p1 = 1 / (1 + 10 ** (elo1 / 400))
-    llr = (
-        w * math.log(p1 / p0)
-        + l * math.log((1 - p1) / (1 - p0))
-        + d * math.log(0.5 / 0.5)
-    )
-    A = math.log((1 - beta) / alpha)
-    B = math.log(beta / (1 - alpha))
-    if llr >= A:
-        return True
-    if llr <= B:
-        return False
-    return None
-
-
 def main(args):
     manager = NetworkManager()
     old_ckpt = manager.latest_checkpoint()
 
-        data = torch.load(ckpt, map_location=Config.DEVICE)
-        net.load_state_dict(data["model_state"])
-        optimizer.load_state_dict(data["optim_state"])
-    return net, optimizer
-
-
-def main(args):
-    manager = NetworkManager()
-
     net, optimizer = load_or_initialize_network(manager)
     buffer = ReplayBuffer()
 
-    for g in range(args.games):
-
-        print(f"Generating game {g + 1}/{args.games}...")
-        for state, policy, value in run_self_play(
-            net, num_simulations=args.simulations
-        ):
-            buffer.add(state, policy, value)
+    print(f"Generating {args.games} games with {args.workers} workers...")
+    run_self_play_pool(
+        net,
+        buffer,
+        args.games,
+        num_workers=args.workers,
+        num_simulations=args.simulations,
+    )
     print(f"Collected {len(buffer)} training positions.")
 
     print("Starting training...")
-    trainer = Trainer(net, buffer, optimizer, epochs=args.epochs)
+    trainer = Trainer(
+        net, buffer, optimizer, epochs=args.epochs, steps_per_epoch=args.steps
+    )
     trainer.train()
+    trainer.close()
 
     new_ckpt = manager.save(net, optimizer, "latest")
+    manager.wait()
     try:
         subprocess.run(
             [
@@ -126,9 +95,11 @@ def main(args):
             num_games=1000,
             num_simulations=Config.NUM_SIMULATIONS,
             max_moves=60,
+            stop_early=True,
         )
-        print("Eval stats", stats)
-        if sprt(stats["wins"], stats["losses"], stats["draws"]):
+        summary = match_summary(stats)
+        print("Eval stats", stats, summary)
+        if summary["sprt"] == "accept":
             print("New network accepted")
         else:
             print("New network rejected, reverting")
@@ -164,13 +135,6 @@ def main(args):
     )
     print("✅ ONNX-Export abgeschlossen: nets/final_model.onnx")
 
-        for state, policy, value in run_self_play(net, num_simulations=args.simulations):
-            buffer.add(state, policy, value)
-    trainer = Trainer(net, buffer, optimizer, epochs=args.epochs)
-    trainer.train()
-    manager.save(net, optimizer, "latest")
-
-
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run minimal training loop")
@@ -184,18 +148,24 @@ if __name__ == "__main__":
     parser.add_argument(
         "--epochs", type=int, default=Config.NUM_EPOCHS, help="Training epochs"
     )
+    parser.add_argument(
+        "--steps",
+        type=int,
+        default=Config.STEPS_PER_EPOCH,
+        help="Optimizer steps per epoch",
+    )
     parser.add_argument(
         "--simulations",
         type=int,
         default=Config.NUM_SIMULATIONS,
         help="MCTS simulations",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=Config.SELF_PLAY_WORKERS,
+        help="Self-play worker processes",
+    )
     args = parser.parse_args()
 
     main(args)
-
-    parser.add_argument("--games", type=int, default=1, help="Number of self-play games")
-    parser.add_argument("--epochs", type=int, default=1, help="Training epochs")
-    parser.add_argument("--simulations", type=int, default=Config.NUM_SIMULATIONS, help="MCTS simulations")
-    main(parser.parse_args())
-
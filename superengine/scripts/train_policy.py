@@ -14,7 +14,7 @@ from chess_ai.action_index import ACTION_SIZE, move_to_index
 
 def load_games(game_dir: str):
     """Load PGN files from ``game_dir`` and return tensors for training."""
-    states, policies, values = [], [], []
+    boards, policies, values = [], [], []
     for pgn_file in glob.glob(os.path.join(game_dir, "*.pgn")):
         with open(pgn_file) as fh:
             while True:
@@ -30,15 +30,14 @@ def load_games(game_dir: str):
                     winner = 0
                 board = game.board()
                 for move in game.mainline_moves():
-                    state = GameEnvironment.encode_board(board)
                     policy = np.zeros(ACTION_SIZE, dtype=np.float32)
                     policy[move_to_index(move)] = 1.0
                     value = winner if board.turn == chess.WHITE else -winner
-                    states.append(state)
+                    boards.append(board.copy(stack=False))
                     policies.append(policy)
                     values.append(value)
                     board.push(move)
-    states = torch.tensor(np.array(states), dtype=torch.float32)
+    states = torch.from_numpy(GameEnvironment.encode_boards(boards))
     policies = torch.tensor(np.array(policies), dtype=torch.float32)
     values = torch.tensor(np.array(values), dtype=torch.float32)
     return TensorDataset(states, policies, values)
@@ -1,6 +1,18 @@
 import chess
+import numpy as np
 
-from chess_ai.action_index import move_to_index, index_to_move, PROMOTIONS
+from chess_ai.action_index import (
+    ACTION_SIZE,
+    FROM_SQUARE,
+    MOVE_INDEX,
+    PROMOTIONS,
+    TO_SQUARE,
+    index_to_move,
+    legal_move_indices,
+    legal_move_mask,
+    move_to_index,
+    sparse_policy,
+)
 
 
 def test_move_to_index_promotions():
@@ -14,3 +26,32 @@ def test_move_to_index_promotions():
         assert idx not in seen
         seen.add(idx)
 
+
+def test_tables_round_trip():
+    for index in range(0, ACTION_SIZE, 7):
+        move = index_to_move(index)
+        assert move_to_index(move) == index
+        assert move.from_square == FROM_SQUARE[index]
+        assert move.to_square == TO_SQUARE[index]
+        assert MOVE_INDEX[move.from_square, move.to_square, move.promotion or 0] == index
+
+
+def test_legal_move_indices_and_mask():
+    board = chess.Board("1r2k3/P7/8/8/8/8/8/4K3 w - - 0 1")
+    expected = [move_to_index(m) for m in board.legal_moves]
+    indices = legal_move_indices(board)
+    assert indices.dtype == np.int32
+    assert indices.tolist() == expected
+    mask = legal_move_mask(board)
+    assert mask.shape == (ACTION_SIZE,)
+    assert np.flatnonzero(mask).tolist() == sorted(expected)
+
+
+def test_sparse_policy_keeps_nonzero_and_most_probable_moves():
+    dense = np.zeros(ACTION_SIZE, dtype=np.float32)
+    dense[[3, 40, 900]] = [0.5, 0.25, 0.125]
+    indices, probs = sparse_policy(dense)
+    assert indices.dtype == np.int32 and probs.dtype == np.float32
+    assert indices.tolist() == [3, 40, 900]
+    assert sorted(sparse_policy(dense, max_moves=2)[0].tolist()) == [3, 40]
+    assert sparse_policy(([7, 11], [0.9, 0.1]))[0].tolist() == [7, 11]
@@ -0,0 +1,40 @@
+import os
+
+import pytest
+import torch
+
+from chess_ai.checkpoint_writer import CheckpointWriter, snapshot, write_checkpoint
+
+
+def test_snapshot_is_independent_of_live_tensors():
+    weight = torch.zeros(3)
+    state = {"model_state": {"w": weight}, "steps": [torch.ones(2)], "epoch": 1}
+    copy = snapshot(state)
+    weight += 1
+    assert torch.equal(copy["model_state"]["w"], torch.zeros(3))
+    assert copy["epoch"] == 1 and torch.equal(copy["steps"][0], torch.ones(2))
+
+
+def test_write_checkpoint_replaces_file_atomically(tmp_path):
+    path = str(tmp_path / "latest.pt")
+    write_checkpoint(path, {"v": torch.tensor(1)})
+    write_checkpoint(path, {"v": torch.tensor(2)})
+    assert torch.load(path)["v"].item() == 2
+    assert os.listdir(tmp_path) == ["latest.pt"]
+
+
+def test_writer_saves_in_background_and_prunes(tmp_path):
+    writer = CheckpointWriter(keep_last=2)
+    for epoch in range(4):
+        writer.submit(str(tmp_path / f"ckpt_epoch{epoch}.pt"), {"epoch": epoch})
+    writer.wait()
+    assert sorted(os.listdir(tmp_path)) == ["ckpt_epoch2.pt", "ckpt_epoch3.pt"]
+    assert torch.load(tmp_path / "ckpt_epoch3.pt")["epoch"] == 3
+
+
+def test_writer_reraises_errors(tmp_path):
+    writer = CheckpointWriter()
+    writer.submit(str(tmp_path / "missing" / "ckpt.pt"), {"epoch": 0})
+    with pytest.raises(FileNotFoundError):
+        writer.wait()
+    writer.wait()
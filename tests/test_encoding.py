@@ -1,3 +1,4 @@
+import chess
 import numpy as np
 from chess_ai.game_environment import GameEnvironment
 
@@ -8,3 +9,85 @@ def test_initial_board_has_correct_channels():
     assert state.shape == (GameEnvironment.NUM_CHANNELS, 8, 8)
     # Check that side to move plane sums to 64 since all ones or zeros are uniform
     assert state[12].max() in (0, 1)
+
+
+def _reference_encoding(board):
+    planes = np.zeros((GameEnvironment.NUM_CHANNELS, 8, 8), dtype=np.float32)
+    for square, piece in board.piece_map().items():
+        row, col = divmod(square, 8)
+        offset = 0 if piece.color == chess.WHITE else 6
+        planes[offset + GameEnvironment.PIECE_TO_IDX[piece.piece_type], row, col] = 1
+    planes[12] = int(board.turn)
+    planes[13] = int(board.has_kingside_castling_rights(chess.WHITE))
+    planes[14] = int(board.has_queenside_castling_rights(chess.WHITE))
+    planes[15] = int(board.has_kingside_castling_rights(chess.BLACK))
+    planes[16] = int(board.has_queenside_castling_rights(chess.BLACK))
+    if board.ep_square is not None:
+        row, col = divmod(board.ep_square, 8)
+        planes[17, row, col] = 1
+    return planes
+
+
+SPECIAL_MOVES = [
+    # Castling on both wings for both sides.
+    ("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1", "e1g1"),
+    ("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1", "e1c1"),
+    ("r3k2r/8/8/8/8/8/8/R3K2R b KQkq - 0 1", "e8g8"),
+    ("r3k2r/8/8/8/8/8/8/R3K2R b KQkq - 0 1", "e8c8"),
+    # En passant capture and promotion with capture.
+    ("4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1", "e5d6"),
+    ("1r2k3/P7/8/8/8/8/8/4K3 w - - 0 1", "a7b8q"),
+]
+
+
+def test_encode_board_matches_reference():
+    for fen, uci in SPECIAL_MOVES:
+        board = chess.Board(fen)
+        expected = _reference_encoding(board)
+        np.testing.assert_array_equal(GameEnvironment.encode_board(board), expected)
+        board.push_uci(uci)
+        expected = _reference_encoding(board)
+        np.testing.assert_array_equal(GameEnvironment.encode_board(board), expected)
+
+
+def test_encode_boards_writes_into_buffer():
+    boards = [chess.Board(fen) for fen, _ in SPECIAL_MOVES]
+    out = np.full((len(boards) + 2, GameEnvironment.NUM_CHANNELS, 8, 8), -1, dtype=np.float32)
+    batch = GameEnvironment.encode_boards(boards, out=out)
+    assert np.shares_memory(batch, out)
+    np.testing.assert_array_equal(batch, np.stack([_reference_encoding(b) for b in boards]))
+    assert (out[len(boards):] == -1).all()
+
+
+def test_incremental_step_and_undo():
+    for fen, uci in SPECIAL_MOVES:
+        env = GameEnvironment(incremental=True)
+        before = env.reset(chess.Board(fen))
+        np.testing.assert_array_equal(before, _reference_encoding(chess.Board(fen)))
+        state, _, _ = env.step(chess.Move.from_uci(uci))
+        np.testing.assert_array_equal(state, _reference_encoding(env.board))
+        env.undo()
+        np.testing.assert_array_equal(env.get_state(), before)
+
+
+def test_incremental_matches_full_encoding_over_a_game():
+    rng = np.random.default_rng(0)
+    env = GameEnvironment(incremental=True)
+    env.reset()
+    for _ in range(120):
+        moves = list(env.board.legal_moves)
+        if not moves:
+            break
+        state, _, done = env.step(moves[rng.integers(len(moves))])
+        np.testing.assert_array_equal(state, GameEnvironment.encode_board(env.board))
+        if done:
+            break
+
+
+def test_packed_states_round_trip():
+    boards = [chess.Board(fen) for fen, _ in SPECIAL_MOVES] + [chess.Board()]
+    dense = np.stack([_reference_encoding(b) for b in boards])
+    packed = GameEnvironment.pack_boards(boards)
+    assert packed.shape == (len(boards), 14)
+    np.testing.assert_array_equal(GameEnvironment.pack_states(dense), packed)
+    np.testing.assert_array_equal(GameEnvironment.unpack_states(packed), dense)
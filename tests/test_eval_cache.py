@@ -0,0 +1,43 @@
+import chess
+import numpy as np
+
+from chess_ai.eval_cache import EvalCache, position_key
+from chess_ai.mcts import legal_move_indices
+
+
+def test_position_key_includes_castling_rights():
+    with_rights = chess.Board("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1")
+    without = chess.Board("r3k2r/8/8/8/8/8/8/R3K2R w - - 0 1")
+    assert with_rights.board_fen() == without.board_fen()
+    assert position_key(with_rights) != position_key(without)
+
+
+def test_cache_rejects_entry_for_different_moves():
+    cache = EvalCache()
+    board = chess.Board()
+    moves = legal_move_indices(board)
+    priors = np.full(len(moves), 1.0 / len(moves), dtype=np.float32)
+    cache.put(1, moves, priors, 0.5)
+
+    cached_priors, value = cache.get(1, moves)
+    assert value == 0.5
+    assert np.allclose(cached_priors, priors, atol=1e-3)
+    assert cache.get(1, moves[:-1]) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_cache_evicts_least_recently_used_within_budget():
+    moves = np.arange(30, dtype=np.int32)
+    priors = np.full(30, 1 / 30, dtype=np.float32)
+    probe = EvalCache()
+    probe.put(0, moves, priors, 0.0)
+    cache = EvalCache(max_bytes=3 * probe.nbytes)
+    for key in range(3):
+        cache.put(key, moves, priors, 0.0)
+    cache.get(0, moves)
+    cache.put(3, moves, priors, 0.0)
+
+    assert len(cache) == 3
+    assert cache.nbytes <= cache.max_bytes
+    assert cache.evictions == 1
+    assert 1 not in cache and 0 in cache
@@ -1,6 +1,7 @@
 import torch
 
-from chess_ai.evaluation import evaluate
+from chess_ai import evaluation
+from chess_ai.evaluation import evaluate, sprt, sprt_pentanomial
 from chess_ai.action_index import ACTION_SIZE
 from chess_ai.config import Config
 
@@ -24,5 +25,49 @@ def test_evaluate_runs():
         stats = evaluate(net, net, num_games=1, num_simulations=1)
     finally:
         Config.DIRICHLET_EPSILON = original_epsilon
-    assert set(stats.keys()) == {"wins", "losses", "draws"}
-    assert sum(stats.values()) == 1
+    assert set(stats.keys()) == {"wins", "losses", "draws", "pairs"}
+    assert stats["wins"] + stats["losses"] + stats["draws"] == 1
+    assert stats["pairs"] == [0] * 5
+
+
+def test_evaluate_refills_concurrent_games():
+    net = DummyNet()
+    stats = evaluate(net, net, num_games=5, num_simulations=2, max_moves=4, concurrent_games=2)
+    assert stats["wins"] + stats["losses"] + stats["draws"] == 5
+    assert sum(stats["pairs"]) == 2
+
+
+def test_evaluate_swaps_colours_within_pairs(monkeypatch):
+    monkeypatch.setattr(Config, "DIRICHLET_EPSILON", 0.0)
+    net = DummyNet()
+    # Black mates with Qh4#: net_b wins the first game, net_a the second.
+    stats = evaluate(
+        net, net, num_games=2, num_simulations=64, max_moves=1, openings=["f2f3 e7e5 g2g4"]
+    )
+    assert (stats["wins"], stats["losses"], stats["draws"]) == (1, 1, 0)
+    assert stats["pairs"] == [0, 0, 1, 0, 0]
+
+
+def test_evaluate_stops_once_sprt_decides(monkeypatch):
+    monkeypatch.setattr(evaluation, "sprt_pentanomial", lambda pairs: True)
+    net = DummyNet()
+    stats = evaluate(
+        net,
+        net,
+        num_games=20,
+        num_simulations=2,
+        max_moves=2,
+        concurrent_games=2,
+        stop_early=True,
+    )
+    assert stats["wins"] + stats["losses"] + stats["draws"] == 2
+    assert sum(stats["pairs"]) == 1
+
+
+def test_sprt_decides_clear_results():
+    assert sprt(300, 100, 100) is True
+    assert sprt(100, 300, 100) is False
+    assert sprt(0, 1, 0) is None
+    assert sprt_pentanomial([0, 5, 20, 30, 15]) is True
+    assert sprt_pentanomial([15, 30, 20, 5, 0]) is False
+    assert sprt_pentanomial([0, 0, 50, 0, 0]) is None
@@ -0,0 +1,74 @@
+import queue
+
+import pytest
+import torch
+
+from chess_ai import gating
+from chess_ai.action_index import ACTION_SIZE
+from chess_ai.config import Config
+from chess_ai.evaluation import match_summary, score_to_elo
+from chess_ai.game_environment import GameEnvironment
+from chess_ai.network_manager import NetworkManager
+from chess_ai.policy_value_net import PolicyValueNet
+
+
+def test_match_summary():
+    summary = match_summary({"wins": 300, "losses": 100, "draws": 100})
+    assert summary["games"] == 500
+    assert summary["win_rate"] == 0.6
+    assert summary["score"] == 0.7
+    assert summary["elo"] == score_to_elo(0.7) > 0
+    assert summary["sprt"] == "accept"
+    assert match_summary({"wins": 0, "losses": 1, "draws": 0})["sprt"] == "continue"
+
+
+def test_gating_worker_publishes_results(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "DEVICE", torch.device("cpu"))
+    monkeypatch.setattr(Config, "NUM_RES_BLOCKS", 2)
+    monkeypatch.setattr(Config, "NUM_FILTERS", 8)
+    manager = NetworkManager(str(tmp_path / "ckpt"))
+    paths = []
+    for name in ("a", "b", "c"):
+        net = PolicyValueNet(GameEnvironment.NUM_CHANNELS, ACTION_SIZE, num_blocks=2, filters=8)
+        paths.append(manager.save(net, torch.optim.SGD(net.parameters(), lr=0.1), name))
+    manager.wait()
+
+    out = tmp_path / "gating"
+    out.mkdir()
+    # "a" arrives alone and becomes the best net; "b" is superseded by "c".
+    gating._gating_worker(_tasks(paths[:1]), str(out), 2, 2, 4, 1)
+    gating._gating_worker(_tasks(paths[1:]), str(out), 2, 2, 4, 1)
+
+    (record,) = gating.read_results(str(out))
+    assert record["candidate"] == paths[2]
+    assert record["reference"] == str(out / gating.BEST_FILE)
+    assert record["games"] == 2
+    assert record["sprt"] in ("accept", "reject", "continue")
+    assert (out / gating.BEST_FILE).exists()
+
+
+def _tasks(paths):
+    tasks = queue.Queue()
+    for path in paths + [None]:
+        tasks.put(path)
+    return tasks
+
+
+def test_gating_worker_records_errors_and_keeps_going(tmp_path):
+    out = tmp_path / "gating"
+    out.mkdir()
+    (out / gating.BEST_FILE).write_bytes(b"")
+    gating._gating_worker(_tasks([str(tmp_path / "pruned.pt")]), str(out), 2, 2, 4, 1)
+    (record,) = gating.read_results(str(out))
+    assert record["candidate"] == str(tmp_path / "pruned.pt")
+    assert "error" in record
+
+
+def test_gating_worker_reports_a_dead_process(tmp_path):
+    worker = gating.GatingWorker(str(tmp_path / "gating"))
+    worker._proc.terminate()
+    worker._proc.join()
+    with pytest.raises(RuntimeError, match="Gating worker exited"):
+        worker.submit(str(tmp_path / "ckpt.pt"))
+    with pytest.raises(RuntimeError, match="Gating worker exited"):
+        worker.close()
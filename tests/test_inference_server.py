@@ -0,0 +1,74 @@
+import queue
+
+import chess
+import numpy as np
+import pytest
+import torch
+
+from chess_ai.action_index import ACTION_SIZE
+from chess_ai.game_environment import GameEnvironment
+from chess_ai.inference_server import MAX_LEGAL_MOVES, InferenceServer, _serve_requests
+from chess_ai.mcts import MCTS, NetworkEvaluator, legal_move_indices
+from chess_ai.policy_value_net import PolicyValueNet
+
+
+def test_inference_server_matches_local_network():
+    net = PolicyValueNet(GameEnvironment.NUM_CHANNELS, ACTION_SIZE, num_blocks=2, filters=8)
+    boards = [chess.Board(), chess.Board("4k3/8/8/8/8/8/8/4K2R w K - 0 1")]
+    states = np.stack([GameEnvironment.encode_board(b) for b in boards])
+    moves = [legal_move_indices(b) for b in boards]
+    expected_priors, expected_values = NetworkEvaluator(net)(states, moves)
+
+    with InferenceServer(net, num_clients=2, client_batch_size=4) as server:
+        client = server.client(1)
+        priors, values = client(states, moves)
+        visits = MCTS(client, num_simulations=16, batch_size=4).run(boards[0])
+
+    assert np.allclose(values, expected_values, atol=1e-5)
+    for got, expected in zip(priors, expected_priors):
+        assert np.allclose(got, expected, atol=1e-5)
+    assert sum(visits.values()) == 16
+
+
+def test_client_raises_when_server_dies():
+    net = PolicyValueNet(GameEnvironment.NUM_CHANNELS, ACTION_SIZE, num_blocks=2, filters=8)
+    board = chess.Board()
+    states = GameEnvironment.encode_board(board)[None]
+    with InferenceServer(net, num_clients=1, client_batch_size=4) as server:
+        client = server.client(0)
+        # Killed without the server loop noticing; the process is left unreaped.
+        server._process.kill()
+        with pytest.raises(RuntimeError, match="no longer running"):
+            client(states, [legal_move_indices(board)])
+
+
+def test_server_batches_never_exceed_max_batch_size():
+    net = PolicyValueNet(GameEnvironment.NUM_CHANNELS, ACTION_SIZE, num_blocks=2, filters=8)
+    batch_sizes = []
+    net.register_forward_pre_hook(lambda _, args: batch_sizes.append(len(args[0])))
+
+    num_clients, n = 3, 3
+    shape = (num_clients, n)
+    buffers = (
+        torch.zeros(shape + (GameEnvironment.NUM_CHANNELS, 8, 8)),
+        torch.zeros(shape + (MAX_LEGAL_MOVES,), dtype=torch.int64),
+        torch.ones(shape, dtype=torch.int64),
+        torch.zeros(shape + (MAX_LEGAL_MOVES,)),
+        torch.zeros(shape),
+    )
+    requests = queue.Queue()
+    for client in range(num_clients):
+        requests.put((client, n))
+    requests.put(None)
+    responses = [queue.Queue() for _ in range(num_clients)]
+    # A long deadline would merge all requests if the size bound leaked.
+    _serve_requests(net, requests, responses, buffers, max_batch_size=4, max_latency=10.0)
+
+    assert batch_sizes == [3, 3, 3]
+    assert [r.get_nowait() for r in responses] == [n] * num_clients
+
+
+def test_server_rejects_client_batches_above_max_batch_size():
+    net = PolicyValueNet(GameEnvironment.NUM_CHANNELS, ACTION_SIZE, num_blocks=2, filters=8)
+    with pytest.raises(ValueError, match="exceeds max_batch_size"):
+        InferenceServer(net, num_clients=1, max_batch_size=4, client_batch_size=8)
@@ -1,30 +1,131 @@
-import os
-import tempfile
+import pickle
 
+import chess
+import lmdb
 import numpy as np
+import pytest
 
+from chess_ai.game_environment import GameEnvironment
 from chess_ai.lmdb_replay_buffer import LMDBReplayBuffer
 
 
+def _state(i):
+    board = chess.Board()
+    for _ in range(i):
+        board.push(next(iter(board.legal_moves)))
+    return GameEnvironment.encode_board(board)
+
+
+def _policy(i):
+    return np.array([i, i + 1], dtype=np.int32), np.array([0.5, 0.5], dtype=np.float32)
+
+
 def test_lmdb_replay_buffer_add_and_sample(tmp_path):
     path = tmp_path / "buffer.lmdb"
     buf = LMDBReplayBuffer(str(path), capacity=10)
     for i in range(5):
-        buf.add(i, i + 0.1, i + 0.2)
+        buf.add(_state(i), _policy(i), i + 0.2)
 
-    states, policies, values = buf.sample(3)
-    assert len(states) == 3
+    states, (policy_idx, policy_probs), values = buf.sample(3)
+    assert states.shape == (3, GameEnvironment.NUM_CHANNELS, 8, 8)
+    assert policy_idx.shape == policy_probs.shape == (3, 2)
     assert len(buf) == 5
+    for state, value in zip(states, values):
+        np.testing.assert_array_equal(state, _state(round(value - 0.2)))
 
 
 def test_lmdb_replay_buffer_prioritized(tmp_path):
     path = tmp_path / "buffer.lmdb"
     buf = LMDBReplayBuffer(str(path), capacity=5)
     for i in range(5):
-        buf.add(i, i + 0.1, i + 0.2, priority=float(i + 1))
+        buf.add(_state(i), _policy(i), i + 0.2, priority=float(i + 1))
 
     np.random.seed(0)
     states1, _, _ = buf.sample_prioritized(3)
     np.random.seed(0)
     states2, _, _ = buf.sample_prioritized(3)
-    assert states1 == states2
+    np.testing.assert_array_equal(states1, states2)
+
+
+def test_lmdb_replay_buffer_add_many_wraps_ring(tmp_path):
+    buf = LMDBReplayBuffer(str(tmp_path / "buffer.lmdb"), capacity=4)
+    buf.add_many([(_state(i), _policy(i), float(i)) for i in range(6)])
+    assert len(buf) == 4
+
+    states, (policy_idx, policy_probs), values = buf.sample(4)
+    # Slots 0 and 1 were overwritten by the fifth and sixth record.
+    assert sorted(values.tolist()) == [2.0, 3.0, 4.0, 5.0]
+    for state, idx, value in zip(states, policy_idx, values):
+        np.testing.assert_array_equal(state, _state(int(value)))
+        np.testing.assert_array_equal(idx, _policy(int(value))[0])
+    np.testing.assert_allclose(policy_probs.sum(axis=1), 1.0)
+
+
+def test_lmdb_priorities_survive_reopen_and_update(tmp_path):
+    path = str(tmp_path / "buffer.lmdb")
+    buf = LMDBReplayBuffer(path, capacity=4)
+    records = [(_state(i), _policy(i), float(i)) for i in range(4)]
+    buf.add_many(records, priorities=[1.0, 1.0, 1.0, 1.0])
+    buf.update_priorities([0, 1, 2], [0.0, 0.0, 0.0])
+    buf.env.close()
+
+    reopened = LMDBReplayBuffer(path, capacity=4)
+    np.testing.assert_array_equal(reopened.priorities, [0.0, 0.0, 0.0, 1.0])
+    _, _, values = reopened.sample_prioritized(4, alpha=1.0)
+    assert (values == 3.0).all()
+    assert (reopened.last_indices == 3).all()
+
+    reopened.update_priorities(reopened.last_indices, np.zeros(4))
+    reopened.update_priorities([1], [1.0])
+    _, _, values = reopened.sample_prioritized(2, alpha=1.0)
+    assert (values == 1.0).all()
+
+
+def _writer(path, rank, games):
+    buf = LMDBReplayBuffer(path, capacity=64)
+    for _ in range(games):
+        buf.add_many([(_state(rank), _policy(rank), float(rank))] * 5)
+
+
+def test_lmdb_concurrent_writers_and_reader(tmp_path):
+    import multiprocessing as mp
+
+    path = str(tmp_path / "buffer.lmdb")
+    reader = LMDBReplayBuffer(path, capacity=64)
+    ctx = mp.get_context("spawn")
+    procs = [ctx.Process(target=_writer, args=(path, rank, 4)) for rank in range(3)]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join()
+        assert proc.exitcode == 0
+
+    assert len(reader) == 60
+    assert reader._meta(reader.META_WRITTEN) == 60
+    states, _, values = reader.sample_prioritized(60)
+    assert set(values.tolist()) <= {0.0, 1.0, 2.0}
+    for state, value in zip(states, values):
+        np.testing.assert_array_equal(state, _state(int(value)))
+    # The reader's tree picked up every slot written by the other processes.
+    expected = (reader.priorities[:60].astype(np.float64) ** 0.6).sum()
+    assert np.isclose(reader._tree.total, expected)
+
+
+def test_lmdb_map_grows_when_full(tmp_path):
+    buf = LMDBReplayBuffer(str(tmp_path / "buffer.lmdb"), capacity=1000, map_size=64 * 1024)
+    buf.add_many([(_state(i % 5), _policy(i), 0.0) for i in range(1000)])
+    assert len(buf) == 1000
+    assert buf.env.info()["map_size"] > 64 * 1024
+
+
+def test_lmdb_rejects_old_pickled_format(tmp_path):
+    path = str(tmp_path / "old.lmdb")
+    env = lmdb.open(path)
+    with env.begin(write=True) as txn:
+        txn.put(b"next", b"1")
+        txn.put(b"size", b"1")
+        txn.put(b"d0", pickle.dumps((_state(0), _policy(0), 1.0)))
+        txn.put(b"p0", pickle.dumps(1.0))
+    env.close()
+    with pytest.raises(ValueError, match="old pickled record format"):
+        LMDBReplayBuffer(path, capacity=4)
@@ -1,7 +1,8 @@
 import chess
+import numpy as np
 import torch
 
-from chess_ai.mcts import MCTS
+from chess_ai.mcts import MCTS, MCTSNode, legal_move_indices
 from chess_ai.action_index import move_to_index, index_to_move, ACTION_SIZE
 
 
@@ -27,3 +28,78 @@ def test_mcts_returns_valid_move_indices():
     for idx in visit_counts:
         move = index_to_move(idx)
         assert move in board.legal_moves
+
+
+def test_mcts_batched_run_spends_all_simulations():
+    board = chess.Board()
+    net = DummyNet()
+    mcts = MCTS(net, num_simulations=20, batch_size=8)
+    visit_counts = mcts.run(board)
+
+    assert sum(visit_counts.values()) == 20
+    # Virtual loss spreads a batch over several root moves.
+    assert sum(1 for v in visit_counts.values() if v > 0) > 1
+
+
+def test_node_select_uses_array_statistics():
+    board = chess.Board()
+    node = MCTSNode()
+    legal = list(board.legal_moves)
+    priors = np.zeros(len(legal), dtype=np.float32)
+    favourite = legal[5]
+    priors[5] = 1.0
+    node.expand(legal_move_indices(board), priors)
+
+    node.backup(0, 0.0)
+    assert node.visit_total == 1
+    assert node.move(node.select(c_puct=1.5)) == favourite
+    assert node.visit_counts()[move_to_index(legal[0])] == 1
+
+
+def test_mcts_reuses_subtree_of_played_moves():
+    board = chess.Board()
+    mcts = MCTS(DummyNet(), num_simulations=64, batch_size=1)
+    visits = mcts.run(board)
+    best = index_to_move(max(visits, key=visits.get))
+    board.push(best)
+    child = mcts._root.child(best)
+    reply_slot = max(child.children, key=lambda s: child.N[s])
+    board.push(child.move(reply_slot))
+    reused = child.N[reply_slot]
+
+    mcts.run(board)
+    assert mcts._root is child.children[reply_slot]
+    assert mcts._root.parent is None
+    assert mcts._root.visit_total >= 64
+    assert reused > 0
+
+    mcts.run(chess.Board("4k3/8/8/8/8/8/8/4K2R w K - 0 1"))
+    assert mcts._root.visit_total == 64
+
+
+def test_mcts_scores_mate_without_touching_the_board():
+    board = chess.Board("6k1/5ppp/8/8/8/8/8/R6K w - - 0 1")
+    fen = board.fen()
+    mcts = MCTS(DummyNet(), num_simulations=200)
+    visits = mcts.run(board)
+
+    assert board.fen() == fen
+    assert index_to_move(max(visits, key=visits.get)) == chess.Move.from_uci("a1a8")
+
+
+def test_mcts_early_stop_keeps_best_move():
+    board = chess.Board("6k1/5ppp/8/8/8/8/8/R6K w - - 0 1")
+    np.random.seed(0)
+    full = MCTS(DummyNet(), num_simulations=400)
+    full_visits = full.run(board)
+    np.random.seed(0)
+    early = MCTS(DummyNet(), num_simulations=400, early_stop=True, min_simulations=16)
+    early_visits = early.run(board)
+
+    assert full.last_simulations == 400
+    assert early.last_simulations < 400
+    assert max(early_visits, key=early_visits.get) == max(full_visits, key=full_visits.get)
+
+    forced = MCTS(DummyNet(), num_simulations=400, early_stop=True, min_simulations=8)
+    forced.run(chess.Board("k7/8/1K6/8/8/8/8/7R b - - 0 1"))
+    assert forced.last_simulations == 8
@@ -10,6 +10,7 @@ def test_load_handles_orig_mod_prefix(tmp_path):
     net = PolicyValueNet(GameEnvironment.NUM_CHANNELS, ACTION_SIZE, num_blocks=1, filters=8)
     optim = torch.optim.SGD(net.parameters(), lr=0.1)
     path = manager.save(net, optim, "test")
+    manager.wait()
     data = torch.load(path)
     # simulate old checkpoint with _orig_mod prefix
     data["model_state"] = {f"_orig_mod.{k}": v for k, v in data["model_state"].items()}
@@ -0,0 +1,20 @@
+import chess
+
+from chess_ai.action_index import ACTION_SIZE, move_to_index
+from chess_ai.game_environment import GameEnvironment
+from chess_ai.parallel_mcts import ParallelMCTS
+from chess_ai.policy_value_net import PolicyValueNet
+
+
+def test_parallel_mcts_merges_root_visits():
+    net = PolicyValueNet(GameEnvironment.NUM_CHANNELS, ACTION_SIZE, num_blocks=2, filters=8)
+    board = chess.Board()
+    with ParallelMCTS(net, num_workers=2, num_simulations=8, batch_size=2) as mcts:
+        visits = mcts.run(board)
+        board.push(chess.Move.from_uci("e2e4"))
+        board.push(chess.Move.from_uci("e7e5"))
+        reply_visits = mcts.run(board)
+
+    assert set(visits) == {move_to_index(m) for m in chess.Board().legal_moves}
+    assert sum(visits.values()) == 8
+    assert set(reply_visits) == {move_to_index(m) for m in board.legal_moves}
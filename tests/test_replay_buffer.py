@@ -1,20 +1,106 @@
+import chess
 import numpy as np
-from chess_ai.replay_buffer import ReplayBuffer
+from chess_ai.game_environment import GameEnvironment
+from chess_ai.replay_buffer import ReplayBuffer, SumTree
 
 
-def test_sample_sorts_indices():
+def _states(n):
+    board = chess.Board()
+    states = []
+    for _ in range(n):
+        states.append(GameEnvironment.encode_board(board))
+        board.push(next(iter(board.legal_moves)))
+    return states
+
+
+def _policy(i):
+    return np.array([i, i + 100], dtype=np.int32), np.array([0.75, 0.25], dtype=np.float32)
+
+
+def test_sample_returns_sorted_stacked_arrays():
     np.random.seed(0)
+    states_in = _states(10)
     buffer = ReplayBuffer(capacity=10)
     for i in range(10):
-        buffer.add(i, i + 0.1, i + 0.2)
+        buffer.add(states_in[i], _policy(i), i + 0.5)
+
+    states, (policy_idx, policy_probs), values = buffer.sample(5)
+
+    indices = (values - 0.5).astype(int)
+    assert len(set(indices)) == 5
+    assert (np.diff(indices) > 0).all()
+    assert states.shape == (5, GameEnvironment.NUM_CHANNELS, 8, 8)
+    np.testing.assert_array_equal(states, np.stack([states_in[i] for i in indices]))
+    np.testing.assert_array_equal(policy_idx, np.stack([_policy(i)[0] for i in indices]))
+    np.testing.assert_array_equal(policy_probs[:, 0], 0.75)
+
+
+def test_ring_buffer_overwrites_oldest():
+    states_in = _states(3)
+    buffer = ReplayBuffer(capacity=2)
+    buffer.add(states_in[0], (np.arange(5), np.full(5, 0.2)), 0.0)
+    buffer.add(states_in[1], _policy(1), 1.0)
+    buffer.add(states_in[2], _policy(2), 2.0)
+    assert len(buffer) == 2
+
+    states, (policy_idx, policy_probs), values = buffer.sample(2)
+    assert sorted(values.tolist()) == [1.0, 2.0]
+    # The shorter policy written over slot 0 leaves no stale entries behind.
+    assert policy_idx.shape == (2, 2)
+    np.testing.assert_allclose(policy_probs.sum(axis=1), 1.0)
+
 
+def test_states_are_stored_packed():
+    buffer = ReplayBuffer(capacity=4)
+    state = _states(1)[0]
+    buffer.add(state, _policy(0), 0.0)
+    assert buffer.states[0].nbytes <= 112
+    states, _, _ = buffer.sample(1)
+    assert states.dtype == np.float32
+    np.testing.assert_array_equal(states[0], state)
+
+
+def test_sum_tree_samples_proportionally():
+    tree = SumTree(5)
+    tree.update(np.arange(5), [1.0, 0.0, 3.0, 0.0, 4.0])
+    assert tree.total == 8.0
+    assert tree.find([0.5, 1.5, 3.9, 4.0, 7.9]).tolist() == [0, 2, 2, 4, 4]
+
+    tree.update([4], [0.0])
+    assert tree.total == 4.0
+    tree.rebuild(np.ones(5))
+    assert tree.total == 5.0
+    assert tree.find([2.5]).tolist() == [2]
+
+
+def test_prioritized_sampling_follows_priorities():
     np.random.seed(0)
-    states, policies, values = buffer.sample(5)
+    states_in = _states(4)
+    buffer = ReplayBuffer(capacity=4)
+    for i in range(4):
+        buffer.add(states_in[i], _policy(i), float(i), priority=0.0 if i != 3 else 1.0)
 
+    _, _, values = buffer.sample_prioritized(4, alpha=1.0)
+    assert (values == 3.0).all()
+
+
+def test_update_priorities_redirects_sampling():
     np.random.seed(0)
-    expected_indices = np.random.choice(10, size=5, replace=False)
-    expected_indices = np.sort(expected_indices)
+    states_in = _states(4)
+    buffer = ReplayBuffer(capacity=4)
+    for i in range(4):
+        buffer.add(states_in[i], _policy(i), float(i), priority=1.0)
+
+    buffer.sample_prioritized(4, alpha=1.0)
+    buffer.update_priorities(buffer.last_indices, np.zeros(4))
+    buffer.update_priorities([2], [5.0])
+    _, _, values = buffer.sample_prioritized(4, alpha=1.0)
+    assert (values == 2.0).all()
+
 
-    assert states == tuple(expected_indices)
-    assert policies == tuple(i + 0.1 for i in expected_indices)
-    assert values == tuple(i + 0.2 for i in expected_indices)
+def test_update_priorities_before_sampling_is_a_no_op():
+    buffer = ReplayBuffer(capacity=4)
+    buffer.add(_states(1)[0], _policy(0), 1.0, priority=2.0)
+    buffer.update_priorities(buffer.last_indices, [])
+    _, _, values = buffer.sample_prioritized(1)
+    assert values.tolist() == [1.0]
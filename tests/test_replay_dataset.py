@@ -0,0 +1,52 @@
+import itertools
+
+import chess
+import numpy as np
+import pytest
+import torch
+
+from chess_ai.game_environment import GameEnvironment
+from chess_ai.replay_buffer import ReplayBuffer
+from chess_ai.replay_dataset import BatchPrefetcher, ReplayDataset
+
+
+def _buffer(n=16):
+    buffer = ReplayBuffer(capacity=n)
+    state = GameEnvironment.encode_board(chess.Board())
+    for i in range(n):
+        buffer.add(state, (np.array([i, i + 1]), np.array([0.5, 0.5])), float(i % 3 - 1))
+    return buffer
+
+
+def test_replay_dataset_streams_collated_batches():
+    dataset = ReplayDataset(_buffer(), batch_size=8)
+    for states, policy_idx, policy_probs, values, indices in itertools.islice(dataset, 3):
+        assert states.shape == (8, GameEnvironment.NUM_CHANNELS, 8, 8)
+        assert policy_idx.dtype == torch.int64
+        assert policy_idx.shape == policy_probs.shape == (8, 2)
+        assert values.shape == (8,)
+        # Each batch carries its own slots, not whatever the buffer sampled last.
+        np.testing.assert_array_equal(policy_idx[:, 0].numpy(), indices.numpy())
+
+
+def test_prefetcher_keeps_order_and_stops():
+    prefetcher = BatchPrefetcher(range(5), depth=2)
+    assert list(prefetcher) == [0, 1, 2, 3, 4]
+    prefetcher.close()
+
+    endless = BatchPrefetcher(ReplayDataset(_buffer(), batch_size=4), depth=2)
+    assert next(endless)[0].shape[0] == 4
+    endless.close()
+    assert not endless._thread.is_alive()
+
+
+def test_prefetcher_forwards_errors():
+    def failing():
+        yield 1
+        raise RuntimeError("sampling failed")
+
+    prefetcher = BatchPrefetcher(failing())
+    assert next(prefetcher) == 1
+    with pytest.raises(RuntimeError, match="sampling failed"):
+        next(prefetcher)
+    prefetcher.close()
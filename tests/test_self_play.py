@@ -0,0 +1,35 @@
+import numpy as np
+import torch
+
+from chess_ai.action_index import ACTION_SIZE
+from chess_ai.game_environment import GameEnvironment
+from chess_ai.self_play import _outcome_records, run_self_play_batch
+
+
+class DummyNet(torch.nn.Module):
+    def forward(self, x):
+        batch = x.size(0)
+        log_p = torch.log_softmax(torch.ones(batch, ACTION_SIZE), dim=1)
+        v = torch.zeros(batch, 1)
+        return log_p, v
+
+
+def test_outcome_records_use_player_to_move_perspective():
+    trajectory = [("w", None, 1), ("b", None, -1)]
+    # Black won: White's position is lost, Black's is won.
+    assert [z for _, _, z in _outcome_records(trajectory, -1.0)] == [-1.0, 1.0]
+
+
+def test_run_self_play_batch_yields_one_trajectory_per_game():
+    np.random.seed(0)
+    games = list(run_self_play_batch(DummyNet(), num_games=2, num_simulations=2))
+
+    assert len(games) == 2
+    for records in games:
+        for state, pi, z in records:
+            assert state.shape == (GameEnvironment.NUM_CHANNELS, 8, 8)
+            indices, probs = pi
+            assert indices.shape == probs.shape
+            assert ((indices >= 0) & (indices < ACTION_SIZE)).all()
+            assert np.isclose(probs.sum(), 1.0)
+            assert z in (-1.0, 0.0, 1.0)
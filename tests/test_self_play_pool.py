@@ -0,0 +1,29 @@
+import pytest
+
+from chess_ai.action_index import ACTION_SIZE
+from chess_ai.game_environment import GameEnvironment
+from chess_ai.policy_value_net import PolicyValueNet
+from chess_ai.replay_buffer import ReplayBuffer
+from chess_ai.self_play_pool import _worker_seeds, run_self_play_pool
+
+
+def test_self_play_pool_fills_buffer():
+    net = PolicyValueNet(GameEnvironment.NUM_CHANNELS, ACTION_SIZE, num_blocks=2, filters=8)
+    buffer = ReplayBuffer(capacity=100_000)
+    added = run_self_play_pool(net, buffer, num_games=2, num_workers=2, num_simulations=2)
+
+    assert added == len(buffer)
+    assert added > 0
+
+
+def test_self_play_pool_raises_when_a_worker_fails():
+    # One input channel too many makes every forward pass in the workers fail.
+    net = PolicyValueNet(GameEnvironment.NUM_CHANNELS + 1, ACTION_SIZE, num_blocks=2, filters=8)
+    with pytest.raises(RuntimeError, match="Self-play workers"):
+        run_self_play_pool(net, ReplayBuffer(capacity=100), num_games=2, num_workers=2)
+
+
+def test_worker_seeds_differ_between_runs_unless_fixed():
+    assert len(set(_worker_seeds(None, 4))) == 4
+    assert _worker_seeds(None, 4) != _worker_seeds(None, 4)
+    assert _worker_seeds(7, 4) == _worker_seeds(7, 4)
@@ -0,0 +1,124 @@
+import chess
+import numpy as np
+import torch
+
+from chess_ai import trainer as trainer_module
+from chess_ai.action_index import ACTION_SIZE
+from chess_ai.game_environment import GameEnvironment
+from chess_ai.policy_value_net import PolicyValueNet
+from chess_ai.replay_buffer import ReplayBuffer
+
+
+def test_trainer_runs_on_cpu(tmp_path, monkeypatch):
+    monkeypatch.setattr(trainer_module.Config, "DEVICE", torch.device("cpu"))
+    monkeypatch.setattr(trainer_module, "checkpoint_dir", str(tmp_path))
+
+    buffer = ReplayBuffer(capacity=32)
+    board = chess.Board()
+    for i in range(32):
+        policy = (np.array([i, i + 7]), np.array([0.5, 0.5]))
+        buffer.add(GameEnvironment.encode_board(board), policy, float(i % 3 - 1))
+
+    net = PolicyValueNet(GameEnvironment.NUM_CHANNELS, ACTION_SIZE, num_blocks=2, filters=8)
+    before = [p.detach().clone() for p in net.parameters()]
+    optimizer = torch.optim.SGD(net.parameters(), lr=0.1)
+    trainer = trainer_module.Trainer(
+        net,
+        buffer,
+        optimizer,
+        batch_size=8,
+        log_dir=str(tmp_path / "runs"),
+        steps_per_epoch=2,
+        accumulation_steps=1,
+    )
+    assert trainer.amp_dtype == torch.bfloat16
+    trainer.train()
+    trainer.close()
+
+    assert any(not torch.equal(b, p) for b, p in zip(before, net.parameters()))
+    assert list(tmp_path.glob("ckpt_epoch0.pt"))
+
+
+def test_trainer_hands_saved_checkpoints_to_gating(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(trainer_module.Config, "DEVICE", torch.device("cpu"))
+    monkeypatch.setattr(trainer_module, "checkpoint_dir", str(tmp_path))
+
+    class Gating:
+        def __init__(self):
+            self.submitted = []
+
+        def submit(self, path):
+            assert torch.load(path)["epoch"] == len(self.submitted)
+            # The confirmation is only printed once the file is complete.
+            assert f"Checkpoint gespeichert: {path}" in capsys.readouterr().out
+            self.submitted.append(path)
+
+    buffer = ReplayBuffer(capacity=8)
+    for i in range(8):
+        buffer.add(GameEnvironment.encode_board(chess.Board()), ([i], [1.0]), 0.0)
+    net = PolicyValueNet(GameEnvironment.NUM_CHANNELS, ACTION_SIZE, num_blocks=2, filters=8)
+    gating = Gating()
+    trainer = trainer_module.Trainer(
+        net,
+        buffer,
+        torch.optim.SGD(net.parameters(), lr=0.1),
+        batch_size=8,
+        epochs=2,
+        log_dir=str(tmp_path / "runs"),
+        steps_per_epoch=1,
+        accumulation_steps=1,
+        gating=gating,
+    )
+    trainer.train()
+    trainer.close()
+
+    assert gating.submitted == [str(tmp_path / f"ckpt_epoch{e}.pt") for e in range(2)]
+
+
+def test_trainer_does_not_train_on_stale_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(trainer_module.Config, "DEVICE", torch.device("cpu"))
+    monkeypatch.setattr(trainer_module, "checkpoint_dir", str(tmp_path))
+
+    consumed = []
+    prefetchers = []
+
+    class RecordingPrefetcher(trainer_module.BatchPrefetcher):
+        def __init__(self, iterable):
+            super().__init__(iterable)
+            prefetchers.append(self)
+
+        def __next__(self):
+            item = super().__next__()
+            consumed.append(item[3].clone())
+            return item
+
+    monkeypatch.setattr(trainer_module, "BatchPrefetcher", RecordingPrefetcher)
+
+    state = GameEnvironment.encode_board(chess.Board())
+    buffer = ReplayBuffer(capacity=16)
+    for i in range(16):
+        buffer.add(state, ([i], [1.0]), 0.0)
+    net = PolicyValueNet(GameEnvironment.NUM_CHANNELS, ACTION_SIZE, num_blocks=2, filters=8)
+    trainer = trainer_module.Trainer(
+        net,
+        buffer,
+        torch.optim.SGD(net.parameters(), lr=0.1),
+        batch_size=4,
+        log_dir=str(tmp_path / "runs"),
+        steps_per_epoch=2,
+        accumulation_steps=1,
+    )
+    trainer.train()
+    assert not prefetchers[-1]._thread.is_alive()
+
+    # Overwrite the whole ring; nothing sampled before this may be trained on.
+    for i in range(16):
+        buffer.add(state, ([i], [1.0]), 1.0)
+    consumed.clear()
+    trainer.train()
+    trainer.close()
+
+    assert len(consumed) == 2
+    assert all(bool((values == 1.0).all()) for values in consumed)
+    assert not prefetchers[-1]._thread.is_alive()
+    assert trainer.last_indices.shape == (4,)
@@ -0,0 +1,78 @@
+import io
+import time
+
+import chess
+import torch
+
+from chess_ai.action_index import ACTION_SIZE
+from chess_ai.config import Config
+from chess_ai.uci import UCIEngine, allocate_time, parse_go, simulation_budget
+
+
+class DummyNet(torch.nn.Module):
+    def forward(self, x):
+        batch = x.size(0)
+        log_p = torch.log_softmax(torch.ones(batch, ACTION_SIZE), dim=1)
+        v = torch.zeros(batch, 1)
+        return log_p, v
+
+
+def test_allocate_time_uses_side_to_move_clock():
+    limits = parse_go("wtime 60000 btime 1000 winc 1000 binc 0".split())
+    assert allocate_time(limits, chess.WHITE, overhead_ms=0) == 60000 / 30 / 1000 + 0.75
+    assert allocate_time(limits, chess.BLACK, overhead_ms=0) < 0.1
+    assert allocate_time(parse_go(["movetime", "500"]), chess.WHITE, overhead_ms=50) == 0.45
+    assert allocate_time(parse_go(["infinite"]), chess.WHITE) is None
+
+
+def test_engine_reports_bestmove_for_node_limited_search():
+    out = io.StringIO()
+    engine = UCIEngine(DummyNet(), out=out)
+    engine.handle("position startpos moves e2e4")
+    engine.handle("go nodes 32")
+    engine.wait()
+
+    lines = out.getvalue().splitlines()
+    assert any(line.startswith("info nodes 32 ") for line in lines)
+    best = lines[-1].split()[1]
+    board = chess.Board()
+    board.push_uci("e2e4")
+    assert chess.Move.from_uci(best) in board.legal_moves
+
+
+def test_engine_ponders_until_stop():
+    out = io.StringIO()
+    engine = UCIEngine(DummyNet(), out=out)
+    engine.handle("position startpos")
+    engine.handle("go ponder wtime 1000 btime 1000")
+    time.sleep(0.2)
+    assert "bestmove" not in out.getvalue()
+    engine.handle("stop")
+    assert out.getvalue().splitlines()[-1].startswith("bestmove")
+
+
+def test_go_depth_maps_to_simulation_budget():
+    assert simulation_budget(parse_go(["depth", "2"])) == 2 * Config.UCI_SIMULATIONS_PER_DEPTH
+    assert simulation_budget(parse_go("depth 2 nodes 10".split())) == 10
+
+    out = io.StringIO()
+    engine = UCIEngine(DummyNet(), out=out)
+    engine.handle("go depth 1")
+    engine.wait()
+    nodes = Config.UCI_SIMULATIONS_PER_DEPTH
+    assert any(line.startswith(f"info nodes {nodes} ") for line in out.getvalue().splitlines())
+
+
+def test_engine_plays_a_legal_move_when_search_fails():
+    class BrokenNet(DummyNet):
+        def forward(self, x):
+            raise RuntimeError("boom")
+
+    out = io.StringIO()
+    engine = UCIEngine(BrokenNet(), out=out)
+    engine.handle("go nodes 8")
+    engine.wait()
+
+    lines = out.getvalue().splitlines()
+    assert any("search failed" in line for line in lines)
+    assert chess.Move.from_uci(lines[-1].split()[1]) in chess.Board().legal_moves